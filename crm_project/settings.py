@@ -35,6 +35,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "leads.middleware.CrmRoleMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -79,6 +80,53 @@ else:
         }
     }
 
+# CACHE — locmem por padrão (por processo)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "crm-cache",
+    }
+}
+
+# Tempo máximo (segundos) das estatísticas do dashboard em cache; sinais invalidam antes
+DASHBOARD_CACHE_TIMEOUT = config("DASHBOARD_CACHE_TIMEOUT", default=300, cast=int)
+# Grupos do usuário (papel) — invalidados ao alterar User.groups, mas só no
+# processo que fez a alteração: com locmem, o TTL é o atraso máximo nos demais
+ROLE_CACHE_TIMEOUT = config("ROLE_CACHE_TIMEOUT", default=30, cast=int)
+
+# EXPORTAÇÕES EM SEGUNDO PLANO — arquivos gerados pelo `run_export_worker`
+EXPORT_ROOT = config("EXPORT_ROOT", default=str(BASE_DIR / "exports"))
+EXPORT_JOB_RETENTION_HOURS = config("EXPORT_JOB_RETENTION_HOURS", default=24, cast=int)
+
+# REST API — listagens paginadas por cursor (?page_size= até API_MAX_PAGE_SIZE)
+API_PAGE_SIZE = config("API_PAGE_SIZE", default=50, cast=int)
+API_MAX_PAGE_SIZE = config("API_MAX_PAGE_SIZE", default=500, cast=int)
+# Itens aceitos por requisição em POST /api/leads/bulk/
+API_BULK_MAX_ITEMS = config("API_BULK_MAX_ITEMS", default=5000, cast=int)
+# Feed de alterações (/api/leads/changes/): remoções guardadas por N dias; alterações
+# mais recentes que SETTLE_SECONDS esperam a próxima chamada (transações em andamento)
+API_CHANGES_RETENTION_DAYS = config("API_CHANGES_RETENTION_DAYS", default=30, cast=int)
+API_CHANGES_SETTLE_SECONDS = config("API_CHANGES_SETTLE_SECONDS", default=5, cast=int)
+
+# Paginação por número de página: acima do limite usa a estimativa do PostgreSQL em vez de COUNT(*)
+APPROX_COUNT_THRESHOLD = config("APPROX_COUNT_THRESHOLD", default=10000, cast=int)
+APPROX_COUNT_CACHE_TIMEOUT = config("APPROX_COUNT_CACHE_TIMEOUT", default=60, cast=int)
+
+REST_FRAMEWORK = {
+    "DEFAULT_PAGINATION_CLASS": "leads.pagination.BoundedCursorPagination",
+    "PAGE_SIZE": API_PAGE_SIZE,
+}
+
+# LOGS DE ATIVIDADE — "buffered" grava em lote numa thread de fundo; "sync" grava na hora (testes)
+AUDIT_LOG_MODE = config("AUDIT_LOG_MODE", default="buffered")
+AUDIT_LOG_BUFFER_SIZE = config("AUDIT_LOG_BUFFER_SIZE", default=100, cast=int)
+AUDIT_LOG_FLUSH_INTERVAL = config("AUDIT_LOG_FLUSH_INTERVAL", default=0.5, cast=float)
+# Máximo de logs aguardando gravação (lotes com falha voltam para a fila)
+AUDIT_LOG_MAX_PENDING = config("AUDIT_LOG_MAX_PENDING", default=10000, cast=int)
+
+# Logs com mais de N dias são movidos para ActivityLogArchive pelo `archive_activity_logs`
+ACTIVITY_LOG_RETENTION_DAYS = config("ACTIVITY_LOG_RETENTION_DAYS", default=180, cast=int)
+
 # PASSWORD VALIDATION
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
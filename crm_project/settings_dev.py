@@ -47,6 +47,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "leads.middleware.CrmRoleMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -82,6 +83,47 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "crm-cache",
+    }
+}
+
+DASHBOARD_CACHE_TIMEOUT = 300
+ROLE_CACHE_TIMEOUT = 30
+
+# REST API — listagens paginadas por cursor
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+API_BULK_MAX_ITEMS = 5000
+API_CHANGES_RETENTION_DAYS = 30
+API_CHANGES_SETTLE_SECONDS = 5
+
+# Paginação com contagem aproximada (estimativa do PostgreSQL acima do limite)
+APPROX_COUNT_THRESHOLD = 10000
+APPROX_COUNT_CACHE_TIMEOUT = 60
+
+REST_FRAMEWORK = {
+    "DEFAULT_PAGINATION_CLASS": "leads.pagination.BoundedCursorPagination",
+    "PAGE_SIZE": API_PAGE_SIZE,
+}
+
+# Logs de atividade gravados em lote ("sync" grava na hora)
+AUDIT_LOG_MODE = "buffered"
+AUDIT_LOG_BUFFER_SIZE = 100
+AUDIT_LOG_FLUSH_INTERVAL = 0.5
+AUDIT_LOG_MAX_PENDING = 10000
+ACTIVITY_LOG_RETENTION_DAYS = 180
+
+# Exportações em segundo plano (run_export_worker)
+EXPORT_ROOT = BASE_DIR / "exports"
+EXPORT_JOB_RETENTION_HOURS = 24
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
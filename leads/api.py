@@ -1,18 +1,82 @@
-from rest_framework import viewsets, permissions
+import json
+
+from rest_framework import viewsets, permissions, status as http_status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import BaseParser, JSONParser
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
+from .audit import log_activity
+from .bulk import bulk_create_leads
+from .changes import ExpiredCursor, decode_changes_cursor, lead_changes, scoped_tombstones
+from .conditional import activity_log_etag, conditional_get, lead_etag, make_etag, scope_etag
 from .models import Lead, ActivityLog
-from .serializers import LeadSerializer, ActivityLogSerializer
+from .pagination import ActivityLogCursorPagination, InvalidCursor, LeadCursorPagination
+from .roles import request_role, scoped_activity_logs, scoped_leads
+from .serializers import (
+    LeadSerializer, ActivityLogSerializer, activity_log_list_values, lead_list_values,
+    serialize_activity_log_rows, serialize_lead_rows,
+)
+
+
+class NDJSONParser(BaseParser):
+    """Um objeto JSON por linha (``application/x-ndjson``), lido linha a linha."""
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        items = []
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(f'Linha {number}: JSON inválido ({exc})')
+        return items
+
+
+def _list_etag(view, request, *args, **kwargs):
+    return scope_etag(request)
+
+
+def _activity_log_etag(view, request, *args, **kwargs):
+    return activity_log_etag(request, view.filter_queryset(view.get_queryset()))
+
+
+def _activity_log_detail_etag(view, request, pk=None, **kwargs):
+    # O log não muda depois de gravado: só o usuário (SET_NULL) e o nome do lead
+    state = (
+        view.get_queryset().filter(pk=pk).values_list('timestamp', 'user_id', 'lead__data_atualizacao').first()
+    )
+    return make_etag(request.get_full_path(), request_role(request).scope, pk, *state) if state else None
+
+
+def _lead_updated(view, request, pk=None, **kwargs):
+    # Uma consulta por requisição, compartilhada entre ETag e Last-Modified
+    if not hasattr(view, '_lead_data_atualizacao'):
+        view._lead_data_atualizacao = (
+            scoped_leads(request).filter(pk=pk).values_list('data_atualizacao', flat=True).first()
+        )
+    return view._lead_data_atualizacao
+
+
+def _lead_etag(view, request, *args, **kwargs):
+    updated = _lead_updated(view, request, *args, **kwargs)
+    return lead_etag(request, updated) if updated else None
 
 
 class LeadViewSet(viewsets.ModelViewSet):
     queryset = Lead.objects.all()
     serializer_class = LeadSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = LeadCursorPagination
 
     def get_queryset(self):
-        queryset = Lead.objects.all()
+        # atendente_nome do LeadSerializer lê lead.atendente
+        queryset = Lead.objects.select_related('atendente')
 
         # Filtros por query parameters
         status = self.request.query_params.get('status', None)
@@ -23,8 +87,7 @@ class LeadViewSet(viewsets.ModelViewSet):
         prob_max = self.request.query_params.get('prob_max', None)
 
         # Filtrar por permissões do usuário
-        if self.request.user.groups.filter(name='ATENDENTE').exists():
-            queryset = queryset.filter(atendente=self.request.user)
+        queryset = scoped_leads(self.request, queryset)
 
         if status:
             queryset = queryset.filter(status=status)
@@ -41,66 +104,145 @@ class LeadViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    @conditional_get(_list_etag)
+    def list(self, request, *args, **kwargs):
+        # Caminho de leitura rápido: dicts a partir de values(), sem ModelSerializer por linha
+        page = self.paginate_queryset(lead_list_values(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(serialize_lead_rows(page))
+
+    @conditional_get(_lead_etag, _lead_updated)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        lead = serializer.save()
-        # Criar log de atividade
-        ActivityLog.objects.create(
-            lead=lead,
-            user=self.request.user,
-            action='created',
-            description=f'Lead criado via API por {self.request.user.get_full_name() or self.request.user.username}'
-        )
+        with transaction.atomic():
+            lead = serializer.save()
+            # Criar log de atividade
+            log_activity(
+                lead=lead,
+                user=self.request.user,
+                action='created',
+                description=f'Lead criado via API por {self.request.user.get_full_name() or self.request.user.username}'
+            )
 
     def perform_update(self, serializer):
         old_instance = self.get_object()
         old_status = old_instance.status
         old_atendente = old_instance.atendente
 
-        lead = serializer.save()
+        with transaction.atomic():
+            lead = serializer.save()
 
-        # Criar logs de atividade
-        if old_status != lead.status:
-            ActivityLog.objects.create(
-                lead=lead,
-                user=self.request.user,
-                action='status_changed',
-                old_value=old_status,
-                new_value=lead.status,
-                description=f'Status alterado via API'
+            # Criar logs de atividade
+            if old_status != lead.status:
+                log_activity(
+                    lead=lead,
+                    user=self.request.user,
+                    action='status_changed',
+                    old_value=old_status,
+                    new_value=lead.status,
+                    description=f'Status alterado via API'
+                )
+
+            if old_atendente != lead.atendente:
+                log_activity(
+                    lead=lead,
+                    user=self.request.user,
+                    action='assigned',
+                    old_value=str(old_atendente) if old_atendente else None,
+                    new_value=str(lead.atendente) if lead.atendente else None,
+                    description=f'Atendente alterado via API'
+                )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Feed incremental: leads criados/alterados e removidos desde ``?since=<cursor>``.
+
+        Sem ``since`` começa do início (carga completa). A resposta traz
+        ``next``, o cursor para a próxima chamada, e ``has_more`` enquanto
+        houver alterações pendentes. Filtros da listagem não se aplicam.
+        """
+        since = request.query_params.get('since', '')
+        try:
+            updated_after, deleted_after = decode_changes_cursor(since) if since else (None, None)
+        except InvalidCursor:
+            return Response({'error': 'Cursor inválido'}, status=400)
+        except ExpiredCursor:
+            return Response(
+                {'error': 'Cursor expirado: refaça a sincronização completa (sem since)'},
+                status=http_status.HTTP_410_GONE,
             )
+        limit = self.paginator.get_page_size(request)
+        feed = lead_changes(
+            scoped_leads(request),
+            scoped_tombstones(request_role(request)),
+            updated_after,
+            deleted_after,
+            limit=limit,
+        )
+        return Response(feed)
 
-        if old_atendente != lead.atendente:
-            ActivityLog.objects.create(
-                lead=lead,
-                user=self.request.user,
-                action='assigned',
-                old_value=str(old_atendente) if old_atendente else None,
-                new_value=str(lead.atendente) if lead.atendente else None,
-                description=f'Atendente alterado via API'
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """Cria vários leads de uma vez: lista JSON ou NDJSON (um lead por linha).
+
+        Itens inválidos não bloqueiam os demais; cada erro volta com o índice
+        do item. Os válidos entram numa única transação via ``bulk_create``.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'Envie uma lista de leads (JSON) ou um lead por linha (NDJSON)'}, status=400)
+        if len(items) > settings.API_BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'Máximo de {settings.API_BULK_MAX_ITEMS} leads por requisição'},
+                status=http_status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             )
 
+        # Mesmo validador do LeadSerializer(many=True), item a item para guardar o índice do erro
+        child = self.get_serializer(many=True).child
+        leads = []
+        errors = []
+        for index, item in enumerate(items):
+            try:
+                leads.append(Lead(**child.run_validation(item)))
+            except ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+
+        user_name = request.user.get_full_name() or request.user.username
+        created = bulk_create_leads(leads, user=request.user, description=f'Lead criado via API (lote) por {user_name}')
+
+        return Response(
+            {'created': len(created), 'ids': [lead.pk for lead in created], 'errors': errors},
+            status=http_status.HTTP_201_CREATED if created or not items else http_status.HTTP_400_BAD_REQUEST,
+        )
+
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
         lead = self.get_object()
         new_status = request.data.get('status')
 
-        if request.user.groups.filter(name='ATENDENTE').exists() and lead.atendente != request.user:
+        if not request_role(request).can_access(lead):
             return Response({'error': 'Permissão negada'}, status=403)
 
         if new_status in dict(Lead.STATUS_CHOICES):
             old_status = lead.status
-            lead.status = new_status
-            lead.save()
+            with transaction.atomic():
+                lead.status = new_status
+                lead.save()
 
-            # Criar log
-            ActivityLog.objects.create(
-                lead=lead,
-                user=request.user,
-                action='status_changed',
-                old_value=old_status,
-                new_value=new_status,
-                description=f'Status alterado via API'
-            )
+                # Criar log
+                log_activity(
+                    lead=lead,
+                    user=request.user,
+                    action='status_changed',
+                    old_value=old_status,
+                    new_value=new_status,
+                    description=f'Status alterado via API'
+                )
 
             return Response({'success': True})
         else:
@@ -111,6 +253,7 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ActivityLog.objects.all()
     serializer_class = ActivityLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ActivityLogCursorPagination
 
     def get_queryset(self):
         queryset = ActivityLog.objects.select_related('lead', 'user')
@@ -121,8 +264,7 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         action = self.request.query_params.get('action', None)
 
         # Filtrar por permissões
-        if self.request.user.groups.filter(name='ATENDENTE').exists():
-            queryset = queryset.filter(lead__atendente=self.request.user)
+        queryset = scoped_activity_logs(self.request, queryset)
 
         if lead:
             queryset = queryset.filter(lead_id=lead)
@@ -131,4 +273,13 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         if action:
             queryset = queryset.filter(action=action)
 
-        return queryset
\ No newline at end of file
+        return queryset
+
+    @conditional_get(_activity_log_etag)
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(activity_log_list_values(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(serialize_activity_log_rows(page))
+
+    @conditional_get(_activity_log_detail_etag)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
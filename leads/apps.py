@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class LeadsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'leads'
-    verbose_name = 'Gerenciamento de Leads'
\ No newline at end of file
+    verbose_name = 'Gerenciamento de Leads'
+
+    def ready(self):
+        from . import signals  # noqa: F401
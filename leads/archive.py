@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ActivityLog, ActivityLogArchive
+
+
+ARCHIVE_BATCH_SIZE = 1000
+
+# Colunas copiadas da tabela quente para o arquivo (o id é preservado)
+ARCHIVE_FIELDS = ('id', 'lead_id', 'user_id', 'action', 'old_value', 'new_value', 'description', 'timestamp')
+
+
+def archive_cutoff(days):
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_logs(cutoff):
+    return ActivityLog.objects.filter(timestamp__lt=cutoff)
+
+
+def archive_activity_logs(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move para ``ActivityLogArchive`` os logs anteriores a ``cutoff``, em lotes.
+
+    Cada lote é uma transação própria (copia e apaga os mesmos ids), então a
+    execução pode ser interrompida e retomada sem perder nem duplicar logs.
+    Retorna o total de logs movidos.
+    """
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                archivable_logs(cutoff)
+                .select_for_update()
+                .order_by('timestamp', 'id')
+                .values(*ARCHIVE_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return total
+            ActivityLogArchive.objects.bulk_create(
+                [ActivityLogArchive(**row) for row in rows], ignore_conflicts=True
+            )
+            ActivityLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        total += len(rows)
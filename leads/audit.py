@@ -0,0 +1,129 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+
+from .models import ActivityLog, Lead
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    """Fila em memória de ActivityLog gravada em lote por uma thread de fundo.
+
+    As entradas só entram na fila após o commit da transação corrente (um
+    rollback descarta o log junto com a alteração) e são gravadas com
+    ``bulk_create`` quando a fila atinge ``buffer_size`` ou a cada
+    ``flush_interval`` segundos. No encerramento normal do processo o que
+    restar é gravado via ``atexit``. Um lote que falha ao gravar volta para
+    o início da fila, limitada a ``max_pending`` entradas. Com ``mode='sync'``
+    cada entrada é gravada na hora, dentro da transação, como antes.
+    """
+
+    def __init__(self, mode='buffered', buffer_size=100, flush_interval=0.5, max_pending=10000):
+        self.mode = mode
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def log(self, **fields):
+        entry = ActivityLog(**fields)
+        if self.mode == 'sync':
+            entry.save()
+            return
+        transaction.on_commit(lambda: self._enqueue(entry))
+
+    def _enqueue(self, entry):
+        self._ensure_thread()
+        with self._lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= self.buffer_size
+        if full:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Falha ao gravar logs de atividade em lote')
+
+    def flush(self):
+        """Grava tudo o que está na fila; retorna a quantidade gravada."""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._pending = self._pending, []
+            if not entries:
+                return 0
+            try:
+                try:
+                    with transaction.atomic():
+                        ActivityLog.objects.bulk_create(entries)
+                except IntegrityError:
+                    # Lead excluído entre o registro e a gravação: descarta só esses logs
+                    _reset_pks(entries)
+                    with transaction.atomic():
+                        existing = set(
+                            Lead.objects.filter(pk__in={entry.lead_id for entry in entries}).values_list('pk', flat=True)
+                        )
+                        entries = [entry for entry in entries if entry.lead_id in existing]
+                        ActivityLog.objects.bulk_create(entries)
+            except Exception:
+                # Banco travado, conexão perdida...: o lote é tentado de novo no próximo ciclo
+                self._requeue(entries)
+                raise
+            return len(entries)
+
+    def _requeue(self, entries):
+        _reset_pks(entries)
+        with self._lock:
+            self._pending[:0] = entries
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                # Fila cheia: descarta as entradas mais antigas
+                del self._pending[:overflow]
+        if overflow > 0:
+            logger.error('Fila de logs de atividade cheia: %d log(s) descartado(s)', overflow)
+
+
+def _reset_pks(entries):
+    # Um bulk_create desfeito pode ter preenchido o id de parte das entradas
+    for entry in entries:
+        entry.pk = None
+        entry._state.adding = True
+
+
+audit_log = AuditLogWriter(
+    mode=settings.AUDIT_LOG_MODE,
+    buffer_size=settings.AUDIT_LOG_BUFFER_SIZE,
+    flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL,
+    max_pending=settings.AUDIT_LOG_MAX_PENDING,
+)
+
+# Encerramento normal (gunicorn, runserver, comandos): nada fica na fila
+atexit.register(audit_log.flush)
+
+
+def log_activity(lead, user, action, old_value=None, new_value=None, description=None):
+    audit_log.log(
+        lead=lead, user=user, action=action, old_value=old_value, new_value=new_value, description=description,
+    )
@@ -0,0 +1,174 @@
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from .models import Lead
+
+
+# Usuários criados na base de rascunho para exercitar cada papel
+BENCHMARK_USERS = {
+    'gestor': 'GESTOR',
+    'atendente': 'ATENDENTE',
+}
+BENCHMARK_PASSWORD = 'benchmark123'
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    user: str
+    url: str
+    # Exportações são lentas: rodam menos vezes
+    heavy: bool = False
+
+
+def default_scenarios(export_days=7):
+    hoje = timezone.localdate()
+    semana = f'data_inicial={hoje - timedelta(days=7)}&data_final={hoje}'
+    export = f'data_inicial={hoje - timedelta(days=export_days)}'
+    return [
+        Scenario('dashboard', 'gestor', '/dashboard/'),
+        Scenario('dashboard ATENDENTE', 'atendente', '/dashboard/'),
+        Scenario('lead_list', 'gestor', '/leads/'),
+        Scenario('lead_list ATENDENTE', 'atendente', '/leads/'),
+        Scenario('lead_list status', 'gestor', '/leads/?status=novo'),
+        Scenario('lead_list status+origem+prioridade', 'gestor', '/leads/?status=contato&origem=instagram&prioridade=alta'),
+        Scenario('lead_list período', 'gestor', f'/leads/?{semana}'),
+        Scenario('lead_list busca', 'gestor', '/leads/?q=maria'),
+        Scenario('lead_list ordem nome', 'gestor', '/leads/?order=nome&page=3'),
+        Scenario('lead_pipeline', 'gestor', '/leads/pipeline/'),
+        Scenario('lead_pipeline ATENDENTE', 'atendente', '/leads/pipeline/'),
+        Scenario('activity_logs', 'gestor', '/leads/activity-logs/'),
+        Scenario('activity_logs ação+período', 'gestor', f'/leads/activity-logs/?action=status_changed&date_from={hoje - timedelta(days=7)}'),
+        Scenario('activity_logs ATENDENTE', 'atendente', '/leads/activity-logs/'),
+        Scenario('api leads', 'gestor', '/api/leads/'),
+        Scenario('api leads status', 'gestor', '/api/leads/?status=novo&page_size=200'),
+        Scenario('api leads ATENDENTE', 'atendente', '/api/leads/'),
+        Scenario('api activity-logs', 'gestor', '/api/activity-logs/'),
+        Scenario('export xlsx', 'gestor', f'/leads/export/xlsx/?{export}', heavy=True),
+        Scenario('export pdf', 'gestor', f'/leads/export/pdf/?{export}', heavy=True),
+    ]
+
+
+@contextmanager
+def scratch_database(keepdb=False, sqlite_path=None, using='default'):
+    """Cria (ou reaproveita, com ``keepdb``) a base de teste do Django e aponta a conexão para ela.
+
+    Em SQLite a base é o arquivo ``sqlite_path`` em vez da base em memória.
+    A base original nunca é tocada; ao sair a conexão volta para ela.
+    """
+    connection = connections[using]
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    if connection.vendor == 'sqlite' and not test_settings.get('NAME') and sqlite_path:
+        test_settings['NAME'] = str(sqlite_path)
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def ensure_benchmark_users():
+    """Usuários GESTOR e ATENDENTE com senha fixa; retorna ``{papel: user}``."""
+    call_command('create_groups', verbosity=0, stdout=StringIO())
+    users = {}
+    for username, group_name in BENCHMARK_USERS.items():
+        user, created = User.objects.get_or_create(username=f'bench_{username}')
+        if created:
+            user.set_password(BENCHMARK_PASSWORD)
+            user.save()
+            user.groups.add(Group.objects.get(name=group_name))
+        users[username] = user
+    return users
+
+
+def seed_to(total, workers=1, seed=42):
+    """Completa a base até ``total`` leads (com atendentes e histórico de logs)."""
+    missing = total - Lead.objects.count()
+    if missing > 0:
+        call_command(
+            'seed_leads', qtd=missing, atendentes=20, logs=True, workers=workers, seed=seed + total,
+            stdout=StringIO(),
+        )
+    return max(missing, 0)
+
+
+def logged_in_clients(users):
+    clients = {}
+    for role, user in users.items():
+        client = Client()
+        client.force_login(user)
+        clients[role] = client
+    return clients
+
+
+class QueryRecorder:
+    """``execute_wrapper`` que conta as consultas e soma o tempo de SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def consume(response):
+    """Lê o corpo inteiro (inclusive respostas em streaming) e retorna o tamanho em bytes."""
+    if getattr(response, 'streaming', False):
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        response.close()
+        return size
+    return len(response.content)
+
+
+def run_request(client, url, using='default'):
+    """Executa um GET medindo latência, consultas e tempo de SQL."""
+    recorder = QueryRecorder()
+    with connections[using].execute_wrapper(recorder):
+        started = time.perf_counter()
+        response = client.get(url)
+        size = consume(response)
+        elapsed = time.perf_counter() - started
+    return {
+        'status': response.status_code,
+        'seconds': elapsed,
+        'queries': recorder.count,
+        'sql_seconds': recorder.seconds,
+        'bytes': size,
+    }
+
+
+def percentile(values, fraction):
+    """Percentil por posição mais próxima (``values`` não vazio)."""
+    ordered = sorted(values)
+    index = min(len(ordered), max(1, math.ceil(fraction * len(ordered)))) - 1
+    return ordered[index]
+
+
+def benchmark_settings_summary():
+    connection = connections['default']
+    return {
+        'vendor': connection.vendor,
+        'audit_log_mode': settings.AUDIT_LOG_MODE,
+        'cache': settings.CACHES['default']['BACKEND'],
+    }
+
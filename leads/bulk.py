@@ -0,0 +1,117 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ActivityLog, Lead, LeadTombstone
+from .search import build_search_document, sync_search_index
+from .stats import LeadSnapshot, apply_lead_stats_changes, invalidate_dashboard_stats, snapshot_lead
+
+
+# Linhas por INSERT nas operações em lote
+BULK_BATCH_SIZE = 500
+
+# Marca "não alterar o atendente" (None significa remover a atribuição)
+KEEP = object()
+
+
+def bulk_create_leads(leads, user=None, description=None, batch_size=BULK_BATCH_SIZE):
+    """Insere ``leads`` com ``bulk_create`` mantendo os derivados em dia.
+
+    ``bulk_create`` não chama ``save()`` nem dispara sinais, então aqui são
+    feitos à mão: documento de busca (e índice FTS5), deltas de LeadStats,
+    um ActivityLog 'created' por lead (quando ``description`` é informada)
+    e a invalidação do cache do dashboard após o commit. Tudo numa única
+    transação.
+    """
+    leads = list(leads)
+    if not leads:
+        return leads
+    for lead in leads:
+        lead.search_document = build_search_document(lead)
+
+    with transaction.atomic():
+        Lead.objects.bulk_create(leads, batch_size=batch_size)
+        sync_search_index(leads)
+        apply_lead_stats_changes((None, snapshot_lead(lead)) for lead in leads)
+        if description is not None:
+            ActivityLog.objects.bulk_create(
+                [ActivityLog(lead=lead, user=user, action='created', description=description) for lead in leads],
+                batch_size=batch_size,
+            )
+        atendente_ids = {lead.atendente_id for lead in leads}
+        transaction.on_commit(lambda: invalidate_dashboard_stats(*atendente_ids))
+    return leads
+
+
+def bulk_update_leads(leads, user, status=None, atendente_id=KEEP):
+    """Altera status e/ou atendente de ``leads`` com um único UPDATE.
+
+    ``leads`` já deve vir filtrado pelo escopo do usuário e pelos ids
+    escolhidos, então a permissão fica no próprio SQL. Os valores antigos
+    são lidos (e travados) numa consulta, só as linhas que realmente mudam
+    são atualizadas, e os logs de auditoria entram com um ``bulk_create``.
+    Retorna a quantidade de leads alterados.
+    """
+    status_labels = dict(Lead.STATUS_CHOICES)
+    with transaction.atomic():
+        rows = list(
+            leads.select_for_update()
+            .order_by()
+            .values_list('pk', 'atendente_id', 'status', 'origem', 'prioridade', 'valor_curso')
+        )
+        changes = []
+        for pk, old_atendente_id, old_status, origem, prioridade, valor_curso in rows:
+            new_status = status or old_status
+            new_atendente_id = old_atendente_id if atendente_id is KEEP else atendente_id
+            if (new_status, new_atendente_id) != (old_status, old_atendente_id):
+                old = LeadSnapshot(old_atendente_id, old_status, origem, prioridade, valor_curso)
+                new = LeadSnapshot(new_atendente_id, new_status, origem, prioridade, valor_curso)
+                changes.append((pk, old, new))
+        if not changes:
+            return 0
+
+        values = {'data_atualizacao': timezone.now()}
+        if status:
+            values['status'] = status
+        if atendente_id is not KEEP:
+            values['atendente_id'] = atendente_id
+        leads.filter(pk__in=[pk for pk, _old, _new in changes]).update(**values)
+
+        # str(User) é o username, como nos logs de lead_edit
+        user_ids = {snapshot.atendente_id for _pk, old, new in changes for snapshot in (old, new)}
+        users = User.objects.in_bulk([user_id for user_id in user_ids if user_id is not None])
+        logs = []
+        for pk, old, new in changes:
+            if old.status != new.status:
+                logs.append(ActivityLog(
+                    lead_id=pk,
+                    user=user,
+                    action='status_changed',
+                    old_value=old.status,
+                    new_value=new.status,
+                    description=f'Status alterado em lote de "{status_labels[old.status]}" para "{status_labels[new.status]}"',
+                ))
+            if old.atendente_id != new.atendente_id:
+                old_user = users.get(old.atendente_id)
+                new_user = users.get(new.atendente_id)
+                logs.append(ActivityLog(
+                    lead_id=pk,
+                    user=user,
+                    action='assigned',
+                    old_value=str(old_user) if old_user else None,
+                    new_value=str(new_user) if new_user else None,
+                    description=f'Atendente alterado em lote para {(new_user.get_full_name() or new_user.username) if new_user else "Nenhum"}',
+                ))
+        ActivityLog.objects.bulk_create(logs, batch_size=BULK_BATCH_SIZE)
+        LeadTombstone.objects.bulk_create(
+            [
+                LeadTombstone(lead_id=pk, atendente_id=old.atendente_id, motivo='reatribuido')
+                for pk, old, new in changes
+                if old.atendente_id is not None and old.atendente_id != new.atendente_id
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        apply_lead_stats_changes((old, new) for _pk, old, new in changes)
+        transaction.on_commit(lambda: invalidate_dashboard_stats(*user_ids))
+    return len(changes)
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.fields import DateTimeField
+
+from .models import LeadTombstone
+from .pagination import InvalidCursor
+from .serializers import LEAD_LIST_VALUES, serialize_lead_rows
+
+
+CHANGES_CURSOR_SALT = 'leads.changes.cursor'
+
+
+class ExpiredCursor(Exception):
+    pass
+
+
+def _position(value):
+    return [value[0].isoformat(), value[1]] if value else None
+
+
+def _parse_position(value):
+    if value is None:
+        return None
+    try:
+        moment, pk = value
+        return datetime.fromisoformat(moment), int(pk)
+    except (TypeError, ValueError):
+        raise InvalidCursor(value)
+
+
+def encode_changes_cursor(updated, deleted, synced_at):
+    """Token opaco com a última alteração e a última remoção entregues."""
+    return signing.dumps(
+        {'u': _position(updated), 'd': _position(deleted), 't': synced_at.isoformat()},
+        salt=CHANGES_CURSOR_SALT,
+    )
+
+
+def decode_changes_cursor(token):
+    """Retorna ``(updated, deleted)``; ``ExpiredCursor`` se as remoções já foram expurgadas."""
+    try:
+        data = signing.loads(token, salt=CHANGES_CURSOR_SALT)
+        updated = _parse_position(data['u'])
+        deleted = _parse_position(data['d'])
+        synced_at = datetime.fromisoformat(data['t'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise InvalidCursor(token)
+    if synced_at < timezone.now() - timedelta(days=settings.API_CHANGES_RETENTION_DAYS):
+        raise ExpiredCursor(token)
+    return updated, deleted
+
+
+def _after(queryset, field, position):
+    if position is None:
+        return queryset
+    moment, pk = position
+    return queryset.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': pk}))
+
+
+def scoped_tombstones(role):
+    """Remoções visíveis no escopo: o atendente também vê os leads que saíram da carteira."""
+    if role.is_atendente:
+        return LeadTombstone.objects.filter(atendente_id=role.user_id)
+    return LeadTombstone.objects.filter(motivo='excluido')
+
+
+def lead_changes(leads, tombstones, updated_after=None, deleted_after=None, limit=100):
+    """Página do feed de alterações a partir das posições do cursor.
+
+    Leads por ``(data_atualizacao, id)`` e remoções por ``(data_exclusao, id)``,
+    ambos indexados, intercalados em ordem de tempo e cortados em ``limit``
+    eventos; o custo depende do volume de alterações, não do tamanho da
+    tabela. Alterações dos últimos ``API_CHANGES_SETTLE_SECONDS`` ficam para
+    a próxima página, para não passar à frente de transações ainda abertas.
+    """
+    synced_at = timezone.now()
+    until = synced_at - timedelta(seconds=settings.API_CHANGES_SETTLE_SECONDS)
+    rows = list(
+        _after(leads.filter(data_atualizacao__lt=until), 'data_atualizacao', updated_after)
+        .order_by('data_atualizacao', 'id')
+        .values(*LEAD_LIST_VALUES, 'data_atualizacao')[:limit + 1]
+    )
+    removals = list(
+        _after(tombstones.filter(data_exclusao__lt=until), 'data_exclusao', deleted_after)
+        .order_by('data_exclusao', 'id')[:limit + 1]
+    )
+
+    events = sorted(
+        [(row['data_atualizacao'], row['id'], 'lead', row) for row in rows]
+        + [(removal.data_exclusao, removal.id, 'removido', removal) for removal in removals],
+        key=lambda event: (event[0], event[2], event[1]),
+    )
+    has_more = len(events) > limit
+    events = events[:limit]
+
+    # Um lead que aparece mais de uma vez na página fica só com o evento mais recente
+    latest = {}
+    for moment, pk, kind, item in events:
+        lead_id = item['id'] if kind == 'lead' else item.lead_id
+        latest[lead_id] = (kind, item)
+        if kind == 'lead':
+            updated_after = (moment, pk)
+        else:
+            deleted_after = (moment, pk)
+
+    to_representation = DateTimeField().to_representation
+    updated_rows = [item for kind, item in latest.values() if kind == 'lead']
+    results = serialize_lead_rows(updated_rows)
+    for item, row in zip(results, updated_rows):
+        item['data_atualizacao'] = to_representation(row['data_atualizacao'])
+    deleted = [
+        {'id': item.lead_id, 'motivo': item.motivo, 'data_exclusao': to_representation(item.data_exclusao)}
+        for kind, item in latest.values() if kind == 'removido'
+    ]
+    return {
+        'results': results,
+        'deleted': deleted,
+        'next': encode_changes_cursor(updated_after, deleted_after, synced_at),
+        'has_more': has_more,
+    }
@@ -0,0 +1,98 @@
+import hashlib
+from functools import wraps
+
+from django.contrib import messages
+from django.db.models import Max, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .changes import scoped_tombstones
+from .models import ActivityLogArchive
+from .roles import request_role, scoped_leads
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:32])
+
+
+def scope_etag(request):
+    """ETag de uma listagem de leads a partir do estado do banco.
+
+    URL, escopo, maior ``data_atualizacao`` e maior ``id`` dos leads do
+    escopo (inserções com datas antigas, como no seed_leads) e a última
+    remoção visível no escopo (exclusões e leads que saíram da carteira).
+    Vale entre processos, sem depender do cache local; nenhuma serialização.
+    """
+    role = request_role(request)
+    state = scoped_leads(request).aggregate(latest=Max("data_atualizacao"), last_id=Max("id"))
+    removed = scoped_tombstones(role).aggregate(last_id=Max("id"))["last_id"]
+    return make_etag(request.get_full_path(), role.scope, state["latest"], state["last_id"], removed)
+
+
+def activity_log_etag(request, logs):
+    """ETag de uma listagem de logs: URL, escopo, maior ``id`` de ``logs`` e marcadores de saída.
+
+    Logs não são editados depois de gravados; só saem da tabela pelo
+    arquivamento (último ``archived_at``) ou junto com o lead excluído
+    (última remoção no escopo). Uma consulta, ``ORDER BY id DESC LIMIT 1``
+    mais duas subconsultas indexadas, sem contar a tabela.
+    """
+    role = request_role(request)
+    state = (
+        logs.order_by("-id")
+        .values("id")
+        .annotate(
+            archived=Subquery(ActivityLogArchive.objects.order_by("-archived_at").values("archived_at")[:1]),
+            removed=Subquery(scoped_tombstones(role).order_by("-id").values("id")[:1]),
+        )
+        .first()
+    ) or {}
+    return make_etag(
+        request.get_full_path(), role.scope, state.get("id"), state.get("archived"), state.get("removed")
+    )
+
+
+def lead_etag(request, data_atualizacao, *extra):
+    """ETag de um lead: URL, escopo e ``data_atualizacao`` (mais ``extra``)."""
+    role = request_role(request)
+    return make_etag(request.get_full_path(), role.scope, data_atualizacao, *extra)
+
+
+def conditional_get(etag_func, last_modified_func=None):
+    """Equivalente ao ``django.views.decorators.http.condition`` para métodos de ViewSet.
+
+    ``etag_func(view, request, *args, **kwargs)`` retorna o ETag (ou None para
+    pular); com ``If-None-Match``/``If-Modified-Since`` correspondentes a
+    resposta é ``304 Not Modified`` sem executar o método.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            etag = etag_func(view, request, *args, **kwargs)
+            last_modified = last_modified_func(view, request, *args, **kwargs) if last_modified_func else None
+            response = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=int(last_modified.timestamp()) if last_modified else None,
+            )
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code == 200:
+                    if etag:
+                        response.headers["ETag"] = etag
+                    if last_modified:
+                        response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def has_pending_messages(request):
+    """Indica se há mensagens a exibir, sem consumi-las."""
+    storage = messages.get_messages(request)
+    pending = any(True for _message in storage)
+    storage.used = False
+    return pending
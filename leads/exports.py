@@ -0,0 +1,487 @@
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from itertools import islice
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
+from reportlab.platypus import LongTable, Paragraph, SimpleDocTemplate, Spacer, TableStyle
+
+from .filters import LEAD_FILTER_PARAMS, filter_leads, filter_values
+from .models import ExportJob, Lead
+
+
+# Linhas lidas do banco por vez durante as exportações
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Linhas CSV agrupadas em cada bloco enviado ao cliente
+CSV_ROWS_PER_CHUNK = 500
+
+# (cabeçalho, largura da coluna no Excel)
+XLSX_COLUMNS = [
+    ('Nome', 25),
+    ('Telefone', 15),
+    ('Email', 25),
+    ('Curso', 20),
+    ('Origem', 12),
+    ('Prioridade', 12),
+    ('Probabilidade', 12),
+    ('Valor Curso', 15),
+    ('Atendente', 20),
+    ('Status', 12),
+    ('Data Criação', 18),
+    ('Observação Interna', 30),
+]
+
+LEAD_EXPORT_FIELDS = (
+    'nome', 'telefone', 'email', 'curso_interesse', 'origem', 'prioridade',
+    'probabilidade_fechamento', 'valor_curso', 'atendente__first_name',
+    'atendente__last_name', 'status', 'data_criacao', 'observacao_interna',
+)
+
+
+def iter_lead_export_rows(leads):
+    """Percorre os leads uma única vez, com o nome do atendente vindo do JOIN.
+
+    Gera dicionários com os valores já formatados para exportação; nenhum
+    objeto Lead é instanciado e o queryset não é mantido em cache.
+    """
+    status_labels = dict(Lead.STATUS_CHOICES)
+    origem_labels = dict(Lead.ORIGEM_CHOICES)
+    prioridade_labels = dict(Lead.PRIORIDADE_CHOICES)
+
+    rows = leads.values_list(*LEAD_EXPORT_FIELDS, named=True).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield {
+            'nome': row.nome,
+            'telefone': row.telefone,
+            'email': row.email or '',
+            'curso_interesse': row.curso_interesse,
+            'origem': origem_labels.get(row.origem, row.origem),
+            'prioridade': prioridade_labels.get(row.prioridade, row.prioridade),
+            'probabilidade_fechamento': row.probabilidade_fechamento,
+            'valor_curso': row.valor_curso,
+            'atendente': f'{row.atendente__first_name or ""} {row.atendente__last_name or ""}'.strip(),
+            'status': status_labels.get(row.status, row.status),
+            'data_criacao': row.data_criacao,
+            'observacao_interna': row.observacao_interna or '',
+        }
+
+
+def _xlsx_styles():
+    border = Border(
+        left=Side(style='thin', color='000000'),
+        right=Side(style='thin', color='000000'),
+        top=Side(style='thin', color='000000'),
+        bottom=Side(style='thin', color='000000')
+    )
+    header = NamedStyle(
+        name='lead_header',
+        font=Font(bold=True, color="FFFFFF", size=12),
+        fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+        alignment=Alignment(horizontal="center", vertical="center"),
+        border=border,
+    )
+    data = NamedStyle(
+        name='lead_data',
+        font=Font(size=10),
+        alignment=Alignment(horizontal="left", vertical="center"),
+        border=border,
+    )
+    return header, data
+
+
+def write_leads_xlsx(leads, fileobj):
+    """Escreve a planilha em modo write-only: as linhas vão direto para disco.
+
+    Os estilos são registrados uma vez como NamedStyle e apenas referenciados
+    pelas células, então a memória não cresce com o número de linhas.
+    """
+    wb = Workbook(write_only=True)
+    header_style, data_style = _xlsx_styles()
+    wb.add_named_style(header_style)
+    wb.add_named_style(data_style)
+
+    ws = wb.create_sheet("Leads")
+    for index, (_header, width) in enumerate(XLSX_COLUMNS):
+        ws.column_dimensions[chr(ord('A') + index)].width = width
+
+    # Congelar a primeira linha
+    ws.freeze_panes = 'A2'
+
+    def styled(value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    ws.append([styled(header, 'lead_header') for header, _width in XLSX_COLUMNS])
+
+    for row in iter_lead_export_rows(leads):
+        ws.append([
+            styled(value, 'lead_data') for value in (
+                row['nome'],
+                row['telefone'],
+                row['email'],
+                row['curso_interesse'],
+                row['origem'],
+                row['prioridade'],
+                f"{row['probabilidade_fechamento']}%",
+                row['valor_curso'] if row['valor_curso'] else '',
+                row['atendente'],
+                row['status'],
+                row['data_criacao'].strftime('%d/%m/%Y %H:%M'),
+                row['observacao_interna'],
+            )
+        ])
+
+    wb.save(fileobj)
+
+
+def leads_xlsx_tempfile(leads):
+    """Gera o XLSX em um arquivo temporário (removido ao ser fechado)."""
+    fileobj = tempfile.TemporaryFile(suffix='.xlsx')
+    write_leads_xlsx(leads, fileobj)
+    fileobj.seek(0)
+    return fileobj
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devolve a linha em vez de armazená-la."""
+
+    def write(self, value):
+        return value
+
+
+def iter_leads_csv(leads):
+    """Gera o CSV em blocos de texto; o cabeçalho sai antes da primeira consulta."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _width in XLSX_COLUMNS])
+
+    lines = []
+    for row in iter_lead_export_rows(leads):
+        lines.append(writer.writerow([
+            row['nome'],
+            row['telefone'],
+            row['email'],
+            row['curso_interesse'],
+            row['origem'],
+            row['prioridade'],
+            row['probabilidade_fechamento'],
+            row['valor_curso'],
+            row['atendente'],
+            row['status'],
+            row['data_criacao'].isoformat(),
+            row['observacao_interna'],
+        ]))
+        if len(lines) >= CSV_ROWS_PER_CHUNK:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def gzip_chunks(chunks):
+    """Comprime um iterável de textos como um único stream gzip."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Linhas por LongTable no PDF: tabelas menores mantêm o layout linear
+PDF_CHUNK_ROWS = 250
+
+PDF_CELL_FONT = 'Helvetica'
+PDF_CELL_FONT_SIZE = 8
+PDF_CELL_PADDING = 8  # LEFTPADDING + RIGHTPADDING
+
+# (cabeçalho, largura, limite de caracteres); colunas com limite quebram linha
+PDF_COLUMNS = [
+    ('Nome', 1.4 * inch, 30),
+    ('Telefone', 0.9 * inch, None),
+    ('Email', 1.4 * inch, 25),
+    ('Curso', 1.2 * inch, 25),
+    ('Origem', 0.8 * inch, None),
+    ('Prioridade', 0.8 * inch, None),
+    ('Prob.', 0.6 * inch, None),
+    ('Valor', 0.9 * inch, None),
+    ('Atendente', 1.2 * inch, 20),
+    ('Status', 0.8 * inch, None),
+    ('Data', 0.8 * inch, None),
+]
+
+PDF_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+    ('TOPPADDING', (0, 0), (-1, 0), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('FONT', (0, 1), (-1, -1), PDF_CELL_FONT, PDF_CELL_FONT_SIZE, PDF_CELL_FONT_SIZE + 2),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('VALIGN', (0, 1), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 1), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 2),
+])
+
+
+def _pdf_styles():
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle('LeadTitle', parent=styles['Title'], fontSize=16, spaceAfter=30, alignment=1),
+        'normal': styles['Normal'],
+        'header': ParagraphStyle(
+            'LeadHeader', fontSize=9, fontName='Helvetica-Bold', alignment=1, textColor=colors.whitesmoke
+        ),
+        'total': ParagraphStyle('LeadTotal', parent=styles['Normal'], fontSize=10, spaceBefore=20, alignment=2),
+    }
+
+
+def _pdf_filter_info(filters):
+    filters = filter_values(filters, LEAD_FILTER_PARAMS)
+    filter_info = []
+    if filters['q']:
+        filter_info.append(f"Busca: {filters['q']}")
+    if filters['status']:
+        filter_info.append(f"Status: {dict(Lead.STATUS_CHOICES).get(filters['status'], filters['status'])}")
+    if filters['origem']:
+        filter_info.append(f"Origem: {dict(Lead.ORIGEM_CHOICES).get(filters['origem'], filters['origem'])}")
+    if filters['atendente']:
+        try:
+            user = User.objects.get(id=filters['atendente'])
+            filter_info.append(f"Atendente: {user.get_full_name() or user.username}")
+        except (User.DoesNotExist, ValueError):
+            filter_info.append(f"Atendente ID: {filters['atendente']}")
+    return filter_info
+
+
+def _pdf_row(row):
+    values = (
+        row['nome'],
+        row['telefone'],
+        row['email'],
+        row['curso_interesse'],
+        row['origem'],
+        row['prioridade'],
+        f"{row['probabilidade_fechamento']}%",
+        f"R$ {row['valor_curso']:,}" if row['valor_curso'] else '',
+        row['atendente'],
+        row['status'],
+        row['data_criacao'].strftime('%d/%m/%Y'),
+    )
+    cells = []
+    for value, (_header, width, max_length) in zip(values, PDF_COLUMNS):
+        if not value:
+            cells.append('-')
+        elif max_length is None:
+            cells.append(value)
+        else:
+            if len(value) > max_length:
+                value = value[:max_length] + '...'
+            # Quebra calculada uma vez aqui; células de texto simples saem bem
+            # mais baratas no layout da tabela do que um Paragraph por célula
+            cells.append('\n'.join(simpleSplit(value, PDF_CELL_FONT, PDF_CELL_FONT_SIZE, width - PDF_CELL_PADDING)))
+    return cells
+
+
+def _pdf_table(rows, styles):
+    header = [Paragraph(title, styles['header']) for title, _width, _max_length in PDF_COLUMNS]
+    table = LongTable([header, *rows], colWidths=[width for _title, width, _max_length in PDF_COLUMNS], repeatRows=1)
+    table.setStyle(PDF_TABLE_STYLE)
+    return table
+
+
+class _StreamingDocTemplate(SimpleDocTemplate):
+    """``SimpleDocTemplate`` que consome os flowables de um iterável.
+
+    O ``build()`` recebe uma lista curta que é reposta a partir do iterável
+    a cada ``handle_flowable``: as tabelas são montadas à medida que as
+    páginas são desenhadas e a memória não cresce com o número de linhas.
+    """
+
+    def build_from(self, flowables, buffered=2):
+        self._source = iter(flowables)
+        self._buffered = buffered
+        self._story = list(islice(self._source, buffered))
+        self.build(self._story)
+
+    def handle_flowable(self, flowables):
+        super().handle_flowable(flowables)
+        # Só a lista do build é reposta (o ReportLab também passa aqui a sua fila interna);
+        # quebras de página devolvem a sobra da tabela para o início dela
+        if flowables is getattr(self, '_story', None):
+            flowables.extend(islice(self._source, max(self._buffered - len(flowables), 0)))
+
+
+def _pdf_flowables(leads, filters, styles):
+    yield Paragraph("Relatório de Leads", styles['title'])
+
+    filter_info = _pdf_filter_info(filters)
+    if filter_info:
+        yield Paragraph(escape("Filtros aplicados: " + ", ".join(filter_info)), styles['normal'])
+        yield Spacer(1, 12)
+
+    total = 0
+    rows = []
+    for row in iter_lead_export_rows(leads):
+        rows.append(_pdf_row(row))
+        total += 1
+        if len(rows) == PDF_CHUNK_ROWS:
+            yield _pdf_table(rows, styles)
+            rows = []
+    if rows or not total:
+        yield _pdf_table(rows, styles)
+
+    yield Paragraph(f"Total de leads: {total}", styles['total'])
+
+
+def write_leads_pdf(leads, fileobj, filters):
+    """Gera o relatório em PDF percorrendo o queryset uma única vez.
+
+    Os estilos são criados uma vez por relatório e as linhas vão para
+    ``LongTable`` de ``PDF_CHUNK_ROWS`` linhas com cabeçalho repetido, em vez
+    de uma única tabela gigante; o total vem da própria iteração.
+    """
+    doc = _StreamingDocTemplate(fileobj, pagesize=landscape(A4))
+    doc.build_from(_pdf_flowables(leads, filters, _pdf_styles()))
+
+
+def leads_pdf_tempfile(leads, filters):
+    """Gera o PDF em um arquivo temporário (removido ao ser fechado)."""
+    fileobj = tempfile.TemporaryFile(suffix='.pdf')
+    write_leads_pdf(leads, fileobj, filters)
+    fileobj.seek(0)
+    return fileobj
+
+
+# Exportações em segundo plano
+
+EXPORT_CONTENT_TYPES = {
+    'xlsx': XLSX_CONTENT_TYPE,
+    'pdf': 'application/pdf',
+}
+
+EXPORT_WRITERS = {
+    'xlsx': lambda leads, fileobj, filters: write_leads_xlsx(leads, fileobj),
+    'pdf': write_leads_pdf,
+}
+
+
+def leads_for_scope(scope):
+    """Leads visíveis no escopo gravado no job ('all' ou 'atendente:<id>')."""
+    leads = Lead.objects.all()
+    if scope != 'all':
+        leads = leads.filter(atendente_id=scope.split(':', 1)[1])
+    return leads
+
+
+def export_fingerprint(scope, formato, filters):
+    payload = json.dumps([scope, formato, filters], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def submit_export_job(user, scope, formato, params):
+    """Enfileira a exportação ou devolve o job idêntico já na fila/em execução.
+
+    Retorna ``(job, created)``. Pedidos concorrentes com o mesmo escopo,
+    filtros e formato caem no mesmo job graças à constraint parcial
+    ``exportjob_unico_ativo``.
+    """
+    filters = {name: value for name, value in filter_values(params, LEAD_FILTER_PARAMS).items() if value}
+    fingerprint = export_fingerprint(scope, formato, filters)
+    active = ExportJob.objects.filter(fingerprint=fingerprint, status__in=ExportJob.ACTIVE_STATUSES)
+
+    job = active.first()
+    if job is not None:
+        return job, False
+    try:
+        with transaction.atomic():
+            job = ExportJob.objects.create(
+                user=user, formato=formato, scope=scope, filters=filters, fingerprint=fingerprint,
+            )
+    except IntegrityError:
+        # Outro pedido idêntico venceu a corrida
+        job = active.first()
+        if job is None:
+            raise
+        return job, False
+    return job, True
+
+
+def claim_next_export_job():
+    """Reserva o job pendente mais antigo; seguro com vários workers em paralelo."""
+    for job in ExportJob.objects.filter(status='pending').order_by('created_at', 'id')[:10]:
+        claimed = ExportJob.objects.filter(pk=job.pk, status='pending').update(
+            status='running', started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def export_job_path(job):
+    return Path(settings.EXPORT_ROOT) / f"leads-{job.pk}.{job.formato}"
+
+
+def run_export_job(job):
+    """Gera o arquivo do job em disco e registra o resultado."""
+    path = export_job_path(job)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.part')
+    try:
+        leads = filter_leads(leads_for_scope(job.scope), job.filters)
+        with open(partial, 'wb') as fileobj:
+            EXPORT_WRITERS[job.formato](leads, fileobj, job.filters)
+        os.replace(partial, path)
+    except Exception as exc:
+        partial.unlink(missing_ok=True)
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='failed', error=str(exc) or exc.__class__.__name__, finished_at=timezone.now()
+        )
+        raise
+    ExportJob.objects.filter(pk=job.pk).update(
+        status='done', file_path=str(path), finished_at=timezone.now()
+    )
+
+
+def requeue_stale_export_jobs(older_than):
+    """Devolve à fila jobs 'running' abandonados por um worker interrompido."""
+    return ExportJob.objects.filter(status='running', started_at__lt=timezone.now() - older_than).update(
+        status='pending', started_at=None
+    )
+
+
+def purge_export_jobs(older_than):
+    """Remove jobs finalizados (e seus arquivos) mais antigos que ``older_than``."""
+    expired = ExportJob.objects.filter(
+        status__in=['done', 'failed'], finished_at__lt=timezone.now() - older_than
+    )
+    removed = 0
+    for job in expired.iterator():
+        if job.file_path:
+            Path(job.file_path).unlink(missing_ok=True)
+        job.delete()
+        removed += 1
+    return removed
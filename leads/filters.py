@@ -0,0 +1,101 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Lead
+from .search import search_leads
+
+
+# Parâmetros GET aceitos pela listagem e pelas exportações de leads
+LEAD_FILTER_PARAMS = [
+    'q', 'status', 'origem', 'atendente', 'prioridade',
+    'prob_min', 'prob_max', 'data_inicial', 'data_final',
+]
+
+# Parâmetros GET aceitos pela tela de logs de atividade ('arquivo' consulta ActivityLogArchive)
+ACTIVITY_LOG_FILTER_PARAMS = ['lead', 'user', 'action', 'date_from', 'date_to', 'arquivo']
+
+
+def filter_values(params, names):
+    """Extrai os filtros informados (strings, vazias quando ausentes)."""
+    return {name: params.get(name, '') or '' for name in names}
+
+
+def day_start(value):
+    """Início (00:00, fuso atual) do dia ``value`` ('AAAA-MM-DD'); None se inválida."""
+    try:
+        day = parse_date(value)
+    except ValueError:
+        return None
+    if day is None:
+        return None
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def date_range(field, date_from='', date_to=''):
+    """Intervalo semiaberto ``[date_from 00:00, date_to + 1 dia 00:00)`` sobre a coluna.
+
+    Diferente de ``field__date__gte``, compara a coluna crua com datetimes no
+    fuso atual, sem converter cada linha, então os índices da coluna são usados.
+    Datas inválidas são ignoradas.
+    """
+    condition = Q()
+    start = day_start(date_from) if date_from else None
+    if start is not None:
+        condition &= Q(**{f'{field}__gte': start})
+    end = day_start(date_to) if date_to else None
+    if end is not None:
+        condition &= Q(**{f'{field}__lt': end + timedelta(days=1)})
+    return condition
+
+
+def filter_leads(leads, params, rank=False):
+    filters = filter_values(params, LEAD_FILTER_PARAMS)
+
+    if filters['q']:
+        leads = search_leads(leads, filters['q'], rank=rank)
+
+    if filters['status']:
+        leads = leads.filter(status=filters['status'])
+
+    if filters['origem']:
+        leads = leads.filter(origem=filters['origem'])
+
+    if filters['atendente']:
+        leads = leads.filter(atendente_id=filters['atendente'])
+
+    if filters['prioridade']:
+        leads = leads.filter(prioridade=filters['prioridade'])
+
+    if filters['prob_min']:
+        leads = leads.filter(probabilidade_fechamento__gte=filters['prob_min'])
+
+    if filters['prob_max']:
+        leads = leads.filter(probabilidade_fechamento__lte=filters['prob_max'])
+
+    if filters['data_inicial'] or filters['data_final']:
+        leads = leads.filter(date_range('data_criacao', filters['data_inicial'], filters['data_final']))
+
+    return leads
+
+
+def filter_activity_logs(logs, params):
+    filters = filter_values(params, ACTIVITY_LOG_FILTER_PARAMS)
+
+    # Nome do lead pela busca indexada (FTS5 / GIN), sem JOIN com LIKE
+    if filters['lead']:
+        logs = logs.filter(lead_id__in=search_leads(Lead.objects.all(), filters['lead']).values('id'))
+
+    # Usuário escolhido pelo id (seletor na tela)
+    if filters['user'].isdigit():
+        logs = logs.filter(user_id=filters['user'])
+
+    if filters['action']:
+        logs = logs.filter(action=filters['action'])
+
+    if filters['date_from'] or filters['date_to']:
+        logs = logs.filter(date_range('timestamp', filters['date_from'], filters['date_to']))
+
+    return logs
@@ -1,12 +1,13 @@
 from django import forms
 from .models import Lead
+from .roles import get_user_role
 
 class LeadForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         # Filtrar atendente apenas para usuários que podem atribuir
-        if self.user and not self.user.groups.filter(name__in=['ADMIN', 'GESTOR']).exists():
+        if self.user and not get_user_role(self.user).is_manager:
             # ATENDENTE só pode ver a si mesmo
             self.fields['atendente'].queryset = self.fields['atendente'].queryset.filter(pk=self.user.pk)
             # Remover campo observacao_interna
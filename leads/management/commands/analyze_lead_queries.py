@@ -0,0 +1,150 @@
+import re
+from datetime import date, timedelta
+from itertools import takewhile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from leads.filters import filter_activity_logs, filter_leads
+from leads.models import Lead, ActivityLog, LeadTombstone
+from leads.views import first_cards_per_status
+
+
+PAGE = 11  # tamanho da página + 1, como na paginação keyset
+
+SQLITE_SCAN_RE = re.compile(r'\bSCAN (\w+)')
+POSTGRES_INDEX_SCAN_RE = re.compile(r'\bIndex (Only )?Scan( Backward)? using')
+POSTGRES_SORT_RE = re.compile(r'(^|->)\s*(Incremental )?Sort\b')
+
+
+def lead_cases(atendente_id):
+    hoje = date.today()
+    ordering = ('-data_criacao', '-id')
+    scoped = Lead.objects.filter(atendente_id=atendente_id)
+    cases = [
+        ('lista', Lead.objects.all(), {}),
+        ('lista ATENDENTE', scoped, {}),
+        ('status', Lead.objects.all(), {'status': 'novo'}),
+        ('status ATENDENTE', scoped, {'status': 'novo'}),
+        ('origem', Lead.objects.all(), {'origem': 'instagram'}),
+        ('prioridade', Lead.objects.all(), {'prioridade': 'alta'}),
+        ('atendente', Lead.objects.all(), {'atendente': str(atendente_id)}),
+        ('probabilidade', Lead.objects.all(), {'prob_min': '80', 'prob_max': '100'}),
+        ('período', Lead.objects.all(), {'data_inicial': str(hoje - timedelta(days=30)), 'data_final': str(hoje)}),
+        ('período ATENDENTE', scoped, {'data_inicial': str(hoje - timedelta(days=30)), 'data_final': str(hoje)}),
+        ('busca', Lead.objects.all(), {'q': 'maria'}),
+    ]
+    for name, leads, params in cases:
+        yield f'leads: {name}', filter_leads(leads, params).order_by(*ordering)[:PAGE]
+
+    desde = timezone.now() - timedelta(days=1)
+    yield 'leads: feed de alterações', Lead.objects.filter(data_atualizacao__gt=desde).order_by('data_atualizacao', 'id')[:PAGE]
+    yield 'leads: feed ATENDENTE', scoped.filter(data_atualizacao__gt=desde).order_by('data_atualizacao', 'id')[:PAGE]
+    yield 'leads: remoções ATENDENTE', (
+        LeadTombstone.objects.filter(atendente_id=atendente_id, data_exclusao__gt=desde).order_by('data_exclusao', 'id')[:PAGE]
+    )
+
+    yield 'leads: pipeline', Lead.objects.filter(id__in=first_cards_per_status(Lead.objects.all()))
+    yield 'leads: pipeline ATENDENTE', scoped.filter(id__in=first_cards_per_status(scoped))
+
+
+def activity_log_cases(atendente_id, user_id, lead_id):
+    hoje = date.today()
+    ordering = ('-timestamp', '-id')
+    logs = ActivityLog.objects.select_related('lead', 'user')
+    cases = [
+        ('lista', logs, {}),
+        ('lista ATENDENTE', logs.filter(lead__atendente_id=atendente_id), {}),
+        ('ação', logs, {'action': 'status_changed'}),
+        ('período', logs, {'date_from': str(hoje - timedelta(days=7)), 'date_to': str(hoje)}),
+        ('usuário', logs, {'user': str(user_id)}),
+        ('usuário + período', logs, {'user': str(user_id), 'date_from': str(hoje - timedelta(days=7))}),
+        ('nome do lead', logs, {'lead': 'maria'}),
+    ]
+    for name, queryset, params in cases:
+        yield f'logs: {name}', filter_activity_logs(queryset, params).order_by(*ordering)[:PAGE]
+    yield 'logs: por lead', logs.filter(lead_id=lead_id).order_by(*ordering)[:PAGE]
+    yield 'logs: por usuário', logs.filter(user_id=user_id).order_by(*ordering)[:PAGE]
+
+
+def explain(queryset):
+    # Executa o EXPLAIN sobre o SQL compilado (também cobre filtros sobre Window)
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        return '\n'.join(' '.join(str(value) for value in row) for row in cursor.fetchall())
+
+
+def full_scans(plan, vendor, tables, limited=False):
+    """Linhas do plano que indicam leitura da tabela inteira.
+
+    Percorrer um índice inteiro também conta: só é aceito quando a consulta
+    tem LIMIT (``limited``) e o plano não ordena o resultado depois, ou seja,
+    a leitura segue a ordem do índice e para nas primeiras linhas.
+    """
+    lines = plan.splitlines()
+    if vendor == 'postgresql':
+        stops_early = limited and not any(POSTGRES_SORT_RE.search(line) for line in lines)
+        scans = []
+        for number, line in enumerate(lines):
+            if 'Seq Scan' in line:
+                scans.append(line.strip())
+            elif POSTGRES_INDEX_SCAN_RE.search(line) and not stops_early:
+                # Sem "Index Cond" o índice é percorrido do início ao fim
+                details = takewhile(lambda detail: '->' not in detail, lines[number + 1:])
+                if not any('Index Cond' in detail for detail in details):
+                    scans.append(line.strip())
+        return scans
+    if vendor == 'sqlite':
+        # "SCAN tabela" sem índice, ou "SCAN tabela USING ... INDEX" que não para
+        # cedo; subconsultas materializadas e FTS não contam
+        stops_early = limited and not any('USE TEMP B-TREE' in line for line in lines)
+        return [
+            line.strip() for line in lines
+            if (match := SQLITE_SCAN_RE.search(line)) and match.group(1) in tables
+            and 'VIRTUAL TABLE' not in line
+            and not ('USING' in line and stops_early)
+        ]
+    return []
+
+
+class Command(BaseCommand):
+    help = 'Executa EXPLAIN nas combinações de filtros canônicas de leads e logs e reporta varreduras sequenciais'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Exibe o plano completo de cada consulta')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Sai com erro se alguma consulta fizer varredura sequencial')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        user = User.objects.order_by('pk').first()
+        user_id = user.pk if user else 0
+        lead = Lead.objects.order_by('pk').only('pk').first()
+        lead_id = lead.pk if lead else 0
+
+        if vendor == 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                'PostgreSQL escolhe Seq Scan em tabelas pequenas; analise em uma base com volume real.'
+            ))
+
+        tables = set(connection.introspection.table_names())
+        problems = []
+        for name, queryset in [*lead_cases(user_id), *activity_log_cases(user_id, user_id, lead_id)]:
+            plan = explain(queryset)
+            scans = full_scans(plan, vendor, tables, limited=queryset.query.high_mark is not None)
+            if scans:
+                problems.append(name)
+                self.stdout.write(self.style.ERROR(f'[SCAN] {name}'))
+                for line in scans:
+                    self.stdout.write(f'       {line}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'[OK]   {name}'))
+            if options['verbose_plans']:
+                self.stdout.write(plan)
+                self.stdout.write('')
+
+        if problems and options['fail_on_scan']:
+            raise CommandError(f'{len(problems)} consulta(s) com varredura sequencial: {", ".join(problems)}')
+        self.stdout.write(f'{len(problems)} consulta(s) com varredura sequencial')
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from leads.archive import ARCHIVE_BATCH_SIZE, archivable_logs, archive_activity_logs, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Move logs de atividade antigos para a tabela de arquivo (ActivityLogArchive)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ACTIVITY_LOG_RETENTION_DAYS,
+            help='Arquiva logs com mais de N dias (padrão: ACTIVITY_LOG_RETENTION_DAYS)',
+        )
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Logs movidos por transação')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas informa quantos logs seriam arquivados')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--days e --batch-size devem ser maiores que zero')
+
+        cutoff = archive_cutoff(options['days'])
+        if options['dry_run']:
+            total = archivable_logs(cutoff).count()
+            self.stdout.write(f'{total} log(s) anterior(es) a {cutoff:%d/%m/%Y %H:%M} seriam arquivados')
+            return
+
+        started = time.monotonic()
+        total = archive_activity_logs(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} log(s) anterior(es) a {cutoff:%d/%m/%Y %H:%M} arquivado(s) em {time.monotonic() - started:.1f}s'
+        ))
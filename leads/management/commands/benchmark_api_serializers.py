@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from leads.models import ActivityLog, Lead
+from leads.serializers import (
+    ActivityLogSerializer, LeadSerializer, activity_log_list_values, lead_list_values,
+    serialize_activity_log_rows, serialize_lead_rows,
+)
+
+
+def measure(fn, repeat):
+    """Melhor tempo de ``repeat`` execuções e o número de consultas da última."""
+    best = None
+    for _ in range(repeat):
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # execute_wrapper não depende de DEBUG nem do limite de queries_log
+        with connection.execute_wrapper(count_query):
+            started = time.perf_counter()
+            rows = fn()
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(queries), len(rows)
+
+
+class Command(BaseCommand):
+    help = 'Compara ModelSerializer e o caminho rápido (values()) das listagens da API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Linhas serializadas por execução')
+        parser.add_argument('--repeat', type=int, default=3, help='Execuções por caminho (vale a melhor)')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        leads = Lead.objects.order_by('-data_criacao', '-id')[:rows]
+        logs = ActivityLog.objects.order_by('-timestamp', '-id')[:rows]
+        if not leads.exists():
+            raise CommandError('Nenhum lead na base; rode `seed_leads` antes')
+
+        cases = [
+            ('leads', lambda: LeadSerializer(leads.all(), many=True).data, lambda: serialize_lead_rows(lead_list_values(leads.all()))),
+            (
+                'logs',
+                lambda: ActivityLogSerializer(logs.select_related('lead', 'user').all(), many=True).data,
+                lambda: serialize_activity_log_rows(activity_log_list_values(logs.all())),
+            ),
+        ]
+        for name, model_serializer, fast_path in cases:
+            slow_time, slow_queries, count = measure(model_serializer, repeat)
+            if not count:
+                self.stdout.write(f'{name}: sem linhas, ignorado')
+                continue
+            fast_time, fast_queries, _count = measure(fast_path, repeat)
+            self.stdout.write(
+                f'{name} ({count} linhas): ModelSerializer {slow_time:.3f}s / {slow_queries} consultas '
+                f'({count / slow_time:,.0f} linhas/s) | values() {fast_time:.3f}s / {fast_queries} consultas '
+                f'({count / fast_time:,.0f} linhas/s) | {slow_time / fast_time:.1f}x'
+            )
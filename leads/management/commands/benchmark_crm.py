@@ -0,0 +1,178 @@
+import json
+import platform
+import subprocess
+import tracemalloc
+from statistics import mean
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from leads.benchmarking import (
+    benchmark_settings_summary, default_scenarios, ensure_benchmark_users, logged_in_clients, percentile,
+    run_request, scratch_database, seed_to,
+)
+from leads.models import ActivityLog, Lead
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(runs):
+    seconds = [run['seconds'] * 1000 for run in runs]
+    sql = [run['sql_seconds'] * 1000 for run in runs]
+    return {
+        'latency_ms': {
+            'min': round(min(seconds), 2),
+            'p50': round(percentile(seconds, 0.50), 2),
+            'p95': round(percentile(seconds, 0.95), 2),
+            'p99': round(percentile(seconds, 0.99), 2),
+            'max': round(max(seconds), 2),
+            'mean': round(mean(seconds), 2),
+        },
+        'sql_ms_p50': round(percentile(sql, 0.50), 2),
+        'queries': max(run['queries'] for run in runs),
+        'bytes': runs[-1]['bytes'],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede views, API e exportações numa base de rascunho populada em escalas configuráveis '
+        '(latência p50/p95/p99, consultas, tempo de SQL e pico de memória, em JSON)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, nargs='+', default=[10000], help='Quantidades de leads (ex.: 10000 100000 1000000)')
+        parser.add_argument('--repeat', type=int, default=20, help='Medições por cenário')
+        parser.add_argument('--repeat-exports', type=int, default=3, help='Medições por cenário de exportação')
+        parser.add_argument('--warmup', type=int, default=1, help='Execuções descartadas antes de medir')
+        parser.add_argument('--export-days', type=int, default=7, help='Exportações filtram os leads dos últimos N dias')
+        parser.add_argument('--only', nargs='+', default=None, help='Roda só os cenários cujo nome contém um destes textos')
+        parser.add_argument('--cold', action='store_true', help='Limpa o cache antes de cada requisição')
+        parser.add_argument('--no-memory', action='store_true', help='Não mede o pico de memória (tracemalloc)')
+        parser.add_argument('--workers', type=int, default=0, help='Processos do seed_leads (0 = número de CPUs)')
+        parser.add_argument('--keepdb', action='store_true', help='Mantém a base de rascunho (reaproveita o seed na próxima execução)')
+        parser.add_argument(
+            '--sqlite-path', default=str(settings.BASE_DIR / 'benchmark.sqlite3'),
+            help='Arquivo da base de rascunho em SQLite',
+        )
+        parser.add_argument('--output', default=None, help='Grava o JSON neste arquivo (padrão: saída padrão)')
+        parser.add_argument('--compare', default=None, help='JSON de uma execução anterior para comparar o p50')
+
+    def handle(self, *args, **options):
+        scales = sorted(set(options['scale']))
+        if scales[0] < 1 or options['repeat'] < 1 or options['repeat_exports'] < 1:
+            raise CommandError('--scale, --repeat e --repeat-exports devem ser positivos')
+        baseline = self.load_baseline(options['compare'])
+
+        scenarios = default_scenarios(export_days=options['export_days'])
+        if options['only']:
+            scenarios = [scenario for scenario in scenarios if any(text in scenario.name for text in options['only'])]
+            if not scenarios:
+                raise CommandError('Nenhum cenário corresponde a --only')
+
+        report = {
+            'meta': {
+                'started_at': timezone.now().isoformat(),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'repeat': options['repeat'],
+                'repeat_exports': options['repeat_exports'],
+                'cold_cache': options['cold'],
+                **benchmark_settings_summary(),
+            },
+            'scales': [],
+        }
+
+        with scratch_database(keepdb=options['keepdb'], sqlite_path=options['sqlite_path']):
+            users = ensure_benchmark_users()
+            for scale in scales:
+                self.stderr.write(f'Populando a base até {scale} leads...')
+                seed_to(scale, workers=options['workers'])
+                clients = logged_in_clients(users)
+                results = []
+                for scenario in scenarios:
+                    result = self.measure(scenario, clients[scenario.user], options)
+                    results.append(result)
+                    self.stderr.write(
+                        f'  [{scale}] {scenario.name}: p50 {result["latency_ms"]["p50"]}ms, '
+                        f'{result["queries"]} consultas'
+                    )
+                report['scales'].append({
+                    'leads': Lead.objects.count(),
+                    'activity_logs': ActivityLog.objects.count(),
+                    'results': results,
+                })
+
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(output)
+            self.stderr.write(self.style.SUCCESS(f'Resultado gravado em {options["output"]}'))
+        else:
+            self.stdout.write(output)
+        if baseline:
+            self.write_comparison(baseline, report)
+
+    def measure(self, scenario, client, options):
+        repeat = options['repeat_exports'] if scenario.heavy else options['repeat']
+        for _ in range(options['warmup']):
+            run_request(client, scenario.url)
+
+        runs = []
+        for _ in range(repeat):
+            if options['cold']:
+                cache.clear()
+            runs.append(run_request(client, scenario.url))
+        statuses = {run['status'] for run in runs}
+        if statuses != {200}:
+            raise CommandError(f'{scenario.name}: respostas inesperadas {sorted(statuses)} em {scenario.url}')
+
+        result = {'name': scenario.name, 'user': scenario.user, 'url': scenario.url, 'runs': repeat, **summarize(runs)}
+        if not options['no_memory']:
+            # Execução separada: o tracemalloc distorce a latência
+            tracemalloc.start()
+            try:
+                run_request(client, scenario.url)
+                _current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            result['peak_memory_kb'] = round(peak / 1024)
+        return result
+
+    def load_baseline(self, path):
+        if not path:
+            return None
+        try:
+            with open(path, encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Não foi possível ler {path}: {exc}')
+
+    def write_comparison(self, baseline, report):
+        previous = {
+            (scale['leads'], result['name']): result
+            for scale in baseline.get('scales', []) for result in scale['results']
+        }
+        self.stderr.write(f'\nComparação com {baseline["meta"].get("revision") or "execução anterior"} (p50):')
+        for scale in report['scales']:
+            for result in scale['results']:
+                before = previous.get((scale['leads'], result['name']))
+                if before is None:
+                    continue
+                old, new = before['latency_ms']['p50'], result['latency_ms']['p50']
+                change = (new - old) / old * 100 if old else 0
+                style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+                self.stderr.write(style(
+                    f'  [{scale["leads"]}] {result["name"]}: {old}ms -> {new}ms ({change:+.0f}%), '
+                    f'consultas {before["queries"]} -> {result["queries"]}'
+                ))
@@ -0,0 +1,15 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from leads.models import LeadTombstone
+
+
+class Command(BaseCommand):
+    help = 'Remove registros de leads removidos mais antigos que API_CHANGES_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=settings.API_CHANGES_RETENTION_DAYS)
+        deleted, _detail = LeadTombstone.objects.filter(data_exclusao__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} registro(s) de remoção expurgado(s)'))
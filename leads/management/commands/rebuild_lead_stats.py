@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from leads.stats import lead_stats_drift, rebuild_lead_stats, invalidate_dashboard_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a tabela LeadStats a partir de Lead e reporta divergências'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Apenas verifica divergências, sem reconstruir (sai com erro se houver)')
+
+    def handle(self, *args, **options):
+        drift = lead_stats_drift()
+
+        for (atendente_id, status, origem, prioridade), esperado, atual in drift:
+            self.stdout.write(
+                f'Divergência atendente={atendente_id or "-"} status={status} origem={origem} prioridade={prioridade}: '
+                f'esperado {esperado[0]} leads / R$ {esperado[1]}, encontrado {atual[0]} leads / R$ {atual[1]}'
+            )
+
+        if options['check']:
+            if drift:
+                raise CommandError(f'{len(drift)} balde(s) de LeadStats divergentes')
+            self.stdout.write(self.style.SUCCESS('LeadStats consistente com Lead'))
+            return
+
+        buckets = rebuild_lead_stats()
+        invalidate_dashboard_stats(*{bucket[0] for bucket, _esperado, _atual in drift})
+        self.stdout.write(self.style.SUCCESS(f'LeadStats reconstruída: {buckets} baldes ({len(drift)} divergências corrigidas)'))
@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from leads.exports import claim_next_export_job, purge_export_jobs, requeue_stale_export_jobs, run_export_job
+
+
+class Command(BaseCommand):
+    help = 'Processa as exportações de leads enfileiradas (vários workers podem rodar em paralelo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Processa a fila atual e encerra')
+        parser.add_argument('--interval', type=float, default=2.0, help='Segundos entre consultas à fila vazia')
+        parser.add_argument('--stale-minutes', type=int, default=30, help='Devolve à fila jobs em execução há mais tempo que isso')
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(minutes=options['stale_minutes'])
+        retention = timedelta(hours=settings.EXPORT_JOB_RETENTION_HOURS)
+
+        requeued = requeue_stale_export_jobs(stale_after)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'{requeued} job(s) abandonado(s) devolvido(s) à fila'))
+
+        while True:
+            close_old_connections()
+            job = claim_next_export_job()
+            if job is None:
+                purged = purge_export_jobs(retention)
+                if purged:
+                    self.stdout.write(f'{purged} exportação(ões) expirada(s) removida(s)')
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+
+            started = time.monotonic()
+            try:
+                run_export_job(job)
+            except Exception as exc:
+                self.stdout.write(self.style.ERROR(f'[FALHOU] {job}: {exc}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'[OK] {job.get_formato_display()} #{job.pk} em {time.monotonic() - started:.1f}s'
+                ))
@@ -1,45 +1,226 @@
-from django.core.management.base import BaseCommand
-from faker import Faker
-from leads.models import Lead
-from django.contrib.auth.models import User
+import os
 import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from multiprocessing import Pool
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from leads.models import ActivityLog, Lead
+from leads.search import build_search_document, sync_search_index
+from leads.stats import rebuild_lead_stats, invalidate_dashboard_stats
+
+
+CURSOS = [
+    'Engenharia de Software',
+    'Administração',
+    'Medicina',
+    'Direito',
+    'Psicologia',
+    'Arquitetura',
+    'Marketing',
+    'Contabilidade',
+]
+
+STATUS_PESOS = {'novo': 30, 'contato': 25, 'progresso': 20, 'convertido': 12, 'perdido': 13}
+ORIGEM_PESOS = {'instagram': 25, 'whatsapp': 20, 'facebook': 12, 'indicacao': 10, 'google': 18, 'organico': 10, 'evento': 5}
+PRIORIDADE_PESOS = {'baixa': 30, 'media': 50, 'alta': 20}
+
+# Caminho percorrido no funil até o status final (gera os logs de status_changed)
+STATUS_CAMINHO = {
+    'novo': [],
+    'contato': ['contato'],
+    'progresso': ['contato', 'progresso'],
+    'convertido': ['contato', 'progresso', 'convertido'],
+    'perdido': ['contato', 'perdido'],
+}
+
+# Leads gerados por tarefa de cada processo
+CHUNK_SIZE = 5000
+
+
+def _weighted(rng, pesos, k):
+    return rng.choices(list(pesos), weights=list(pesos.values()), k=k)
+
+
+def generate_rows(task):
+    """Gera ``count`` leads falsos (dicts) num processo do pool; determinístico pela ``seed``."""
+    seed, count, dias, atendente_ids, agora = task
+    fake = Faker('pt_BR')
+    fake.seed_instance(seed)
+    rng = random.Random(seed)
+    hoje = agora.date()
+    janela = dias * 86400
+
+    statuses = _weighted(rng, STATUS_PESOS, count)
+    origens = _weighted(rng, ORIGEM_PESOS, count)
+    prioridades = _weighted(rng, PRIORIDADE_PESOS, count)
+
+    rows = []
+    for index in range(count):
+        status = statuses[index]
+        nome = fake.name()
+        criacao = agora - timedelta(seconds=rng.uniform(0, janela))
+        atualizacao = criacao + timedelta(seconds=rng.uniform(0, (agora - criacao).total_seconds()))
+        if status == 'convertido':
+            probabilidade = 100
+        elif status == 'perdido':
+            probabilidade = 0
+        else:
+            probabilidade = rng.randrange(0, 100, 5)
+        rows.append({
+            'nome': nome,
+            'telefone': fake.phone_number(),
+            'email': f'{fake.user_name()}{rng.randint(1, 9999)}@{fake.free_email_domain()}' if rng.random() < 0.9 else None,
+            'curso_interesse': rng.choice(CURSOS),
+            'status': status,
+            'origem': origens[index],
+            'prioridade': prioridades[index],
+            'probabilidade_fechamento': probabilidade,
+            'valor_curso': Decimal(rng.randrange(50000, 500000, 500)) / 100,
+            'atendente_id': rng.choice(atendente_ids) if atendente_ids and rng.random() < 0.95 else None,
+            'data_criacao': criacao,
+            'data_atualizacao': atualizacao,
+            'data_proximo_contato': (
+                hoje + timedelta(days=rng.randint(-15, 45)) if status in ('novo', 'contato', 'progresso') else None
+            ),
+            'observacoes': fake.text(max_nb_chars=200) if rng.random() < 0.5 else '',
+            'observacao_interna': fake.sentence() if rng.random() < 0.2 else None,
+        })
+    return rows
+
+
+def activity_history(lead, status_labels):
+    """Logs de criação e de cada mudança de status até o status atual, em ordem de tempo."""
+    caminho = STATUS_CAMINHO[lead.status]
+    inicio = lead.data_criacao
+    passo = (lead.data_atualizacao - inicio) / (len(caminho) or 1)
+    logs = [ActivityLog(
+        lead=lead,
+        user_id=lead.atendente_id,
+        action='created',
+        description='Lead criado pelo seed_leads',
+        timestamp=inicio,
+    )]
+    anterior = 'novo'
+    for numero, status in enumerate(caminho, start=1):
+        logs.append(ActivityLog(
+            lead=lead,
+            user_id=lead.atendente_id,
+            action='status_changed',
+            old_value=anterior,
+            new_value=status,
+            description=f'Status alterado de "{status_labels[anterior]}" para "{status_labels[status]}"',
+            timestamp=inicio + passo * numero,
+        ))
+        anterior = status
+    return logs
+
+
+@contextmanager
+def explicit_timestamps():
+    """Desliga auto_now/auto_now_add de Lead para gravar as datas geradas."""
+    fields = [Lead._meta.get_field('data_criacao'), Lead._meta.get_field('data_atualizacao')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
 
 class Command(BaseCommand):
-    help = 'Gera leads falsos para testes'
+    help = 'Gera leads falsos para testes (em lote; use --workers para gerar em paralelo)'
 
     def add_arguments(self, parser):
         parser.add_argument('--qtd', type=int, default=50, help='Quantidade de leads a gerar')
+        parser.add_argument('--dias', type=int, default=365, help='Distribui data_criacao pelos últimos N dias')
+        parser.add_argument('--atendentes', type=int, default=0, help='Cria N usuários ATENDENTE (senha atendente123)')
+        parser.add_argument('--logs', action='store_true', help='Gera histórico de ActivityLog (criação e mudanças de status)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Linhas por INSERT')
+        parser.add_argument('--workers', type=int, default=1, help='Processos gerando dados falsos (0 = número de CPUs)')
+        parser.add_argument('--seed', type=int, default=None, help='Semente para gerar sempre os mesmos dados')
 
     def handle(self, *args, **options):
-        fake = Faker('pt_BR')
         qtd = options['qtd']
+        if qtd < 0 or options['dias'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--qtd, --dias e --batch-size devem ser positivos')
+        workers = options['workers'] or os.cpu_count() or 1
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
 
         # Garantir que há usuários
         if not User.objects.exists():
             User.objects.create_user(username='admin', password='admin123')
+        if options['atendentes']:
+            self.create_atendentes(options['atendentes'])
 
-        users = list(User.objects.all())
-
-        cursos = [
-            'Engenharia de Software',
-            'Administração',
-            'Medicina',
-            'Direito',
-            'Psicologia',
-            'Arquitetura',
-            'Marketing',
-            'Contabilidade',
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        agora = timezone.now()
+        tasks = [
+            (seed + number, min(CHUNK_SIZE, qtd - start), options['dias'], user_ids, agora)
+            for number, start in enumerate(range(0, qtd, CHUNK_SIZE))
         ]
 
-        for _ in range(qtd):
-            Lead.objects.create(
-                nome=fake.name(),
-                telefone=fake.phone_number(),
-                email=fake.email(),
-                curso_interesse=random.choice(cursos),
-                status=random.choice([choice[0] for choice in Lead.STATUS_CHOICES]),
-                atendente=random.choice(users) if users else None,
-                observacoes=fake.text(max_nb_chars=200) if random.choice([True, False]) else '',
-            )
-
-        self.stdout.write(self.style.SUCCESS(f'{qtd} leads criados com sucesso!'))
\ No newline at end of file
+        started = time.monotonic()
+        created = logs = 0
+        status_labels = dict(Lead.STATUS_CHOICES)
+        # Os processos do pool só geram dados; toda a gravação fica neste processo
+        pool = Pool(workers) if workers > 1 and len(tasks) > 1 else None
+        try:
+            chunks = pool.imap(generate_rows, tasks) if pool else map(generate_rows, tasks)
+            with explicit_timestamps():
+                for rows in chunks:
+                    leads = [Lead(**row) for row in rows]
+                    for lead in leads:
+                        lead.search_document = build_search_document(lead)
+                    with transaction.atomic():
+                        Lead.objects.bulk_create(leads, batch_size=options['batch_size'])
+                        sync_search_index(leads)
+                        if options['logs']:
+                            history = [log for lead in leads for log in activity_history(lead, status_labels)]
+                            ActivityLog.objects.bulk_create(history, batch_size=options['batch_size'])
+                            logs += len(history)
+                    created += len(leads)
+                    if len(tasks) > 1:
+                        self.stdout.write(f'{created}/{qtd} leads ({created / (time.monotonic() - started):.0f}/s)')
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        # Os leads são criados fora dos fluxos que mantêm LeadStats
+        rebuild_lead_stats()
+        invalidate_dashboard_stats(*user_ids)
+
+        resumo = f'{created} leads criados com sucesso'
+        if options['logs']:
+            resumo += f' ({logs} logs de atividade)'
+        self.stdout.write(self.style.SUCCESS(f'{resumo} em {time.monotonic() - started:.1f}s!'))
+
+    def create_atendentes(self, quantidade):
+        grupo, _created = Group.objects.get_or_create(name='ATENDENTE')
+        existentes = set(User.objects.filter(username__startswith='atendente').values_list('username', flat=True))
+        # Um único hash para todos: make_password é lento de propósito
+        senha = make_password('atendente123')
+        fake = Faker('pt_BR')
+        novos = []
+        for numero in range(1, quantidade + 1):
+            username = f'atendente{numero:03d}'
+            if username not in existentes:
+                novos.append(User(
+                    username=username,
+                    first_name=fake.first_name(),
+                    last_name=fake.last_name(),
+                    password=senha,
+                ))
+        User.objects.bulk_create(novos)
+        grupo.user_set.add(*User.objects.filter(username__in=[user.username for user in novos]))
+        self.stdout.write(f'{len(novos)} atendente(s) criado(s)')
@@ -0,0 +1,134 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_lead_stats(apps, schema_editor):
+    Lead = apps.get_model("leads", "Lead")
+    LeadStats = apps.get_model("leads", "LeadStats")
+    rows = (
+        Lead.objects.order_by()
+        .values("atendente_id", "status", "origem", "prioridade")
+        .annotate(total=models.Count("id"), valor_total=models.Sum("valor_curso"))
+    )
+    LeadStats.objects.bulk_create(
+        LeadStats(
+            atendente_id=row["atendente_id"],
+            status=row["status"],
+            origem=row["origem"],
+            prioridade=row["prioridade"],
+            total=row["total"],
+            valor_total=row["valor_total"] or 0,
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0003_activitylog"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeadStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("novo", "Novo"),
+                            ("contato", "Em Contato"),
+                            ("progresso", "Em Progresso"),
+                            ("convertido", "Convertido"),
+                            ("perdido", "Perdido"),
+                        ],
+                        max_length=20,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "origem",
+                    models.CharField(
+                        choices=[
+                            ("instagram", "Instagram"),
+                            ("whatsapp", "WhatsApp"),
+                            ("facebook", "Facebook"),
+                            ("indicacao", "Indicação"),
+                            ("google", "Google"),
+                            ("organico", "Orgânico"),
+                            ("evento", "Evento"),
+                        ],
+                        max_length=20,
+                        verbose_name="Origem do Lead",
+                    ),
+                ),
+                (
+                    "prioridade",
+                    models.CharField(
+                        choices=[
+                            ("baixa", "Baixa"),
+                            ("media", "Média"),
+                            ("alta", "Alta"),
+                        ],
+                        max_length=10,
+                        verbose_name="Prioridade",
+                    ),
+                ),
+                (
+                    "total",
+                    models.IntegerField(default=0, verbose_name="Total de Leads"),
+                ),
+                (
+                    "valor_total",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Soma do Valor do Curso",
+                    ),
+                ),
+                (
+                    "atendente",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Atendente",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Estatística de Leads",
+                "verbose_name_plural": "Estatísticas de Leads",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("atendente", "status", "origem", "prioridade"),
+                        name="leadstats_unique_bucket",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("atendente__isnull", True)),
+                        fields=("status", "origem", "prioridade"),
+                        name="leadstats_unique_bucket_sem_atendente",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(populate_lead_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:59
+
+from django.db import migrations, models
+
+from leads.search import FTS_TABLE, SEARCH_FIELDS, normalize_search_text
+
+
+def backfill_search_document(apps, schema_editor):
+    Lead = apps.get_model("leads", "Lead")
+    batch = []
+    for lead in Lead.objects.only("id", *SEARCH_FIELDS).iterator(chunk_size=2000):
+        lead.search_document = " ".join(
+            normalize_search_text(getattr(lead, field))
+            for field in SEARCH_FIELDS
+            if getattr(lead, field)
+        )
+        batch.append(lead)
+        if len(batch) >= 2000:
+            Lead.objects.bulk_update(batch, ["search_document"])
+            batch = []
+    if batch:
+        Lead.objects.bulk_update(batch, ["search_document"])
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS leads_lead_search_gin ON leads_lead "
+            "USING gin (to_tsvector('simple'::regconfig, search_document))"
+        )
+    elif vendor == "sqlite":
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            if "ENABLE_FTS5" not in {row[0] for row in cursor.fetchall()}:
+                # Sem FTS5 a busca usa LIKE sobre search_document
+                return
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "search_document, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, search_document) "
+            "SELECT id, search_document FROM leads_lead"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS leads_lead_search_gin")
+    elif vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0004_leadstats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lead",
+            name="search_document",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Documento de Busca",
+            ),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
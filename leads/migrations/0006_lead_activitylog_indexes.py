@@ -0,0 +1,96 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0005_lead_search_document"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="lead",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("novo", "Novo"),
+                    ("contato", "Em Contato"),
+                    ("progresso", "Em Progresso"),
+                    ("convertido", "Convertido"),
+                    ("perdido", "Perdido"),
+                ],
+                default="novo",
+                max_length=20,
+                verbose_name="Status",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="activitylog",
+            index=models.Index(fields=["timestamp", "id"], name="log_timestamp_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="activitylog",
+            index=models.Index(
+                fields=["lead", "timestamp"], name="log_lead_timestamp_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="activitylog",
+            index=models.Index(
+                fields=["user", "timestamp"], name="log_user_timestamp_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="activitylog",
+            index=models.Index(
+                fields=["action", "timestamp"], name="log_action_timestamp_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(fields=["data_criacao", "id"], name="lead_criacao_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["atendente", "data_criacao", "id"],
+                name="lead_atendente_criacao_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["status", "data_criacao", "id"], name="lead_status_criacao_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["atendente", "status", "data_criacao"],
+                name="lead_atend_status_criacao_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["origem", "data_criacao"], name="lead_origem_criacao_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["prioridade", "data_criacao"],
+                name="lead_prioridade_criacao_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["probabilidade_fechamento"], name="lead_probabilidade_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0006_lead_activitylog_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "formato",
+                    models.CharField(
+                        choices=[("xlsx", "Excel"), ("pdf", "PDF")],
+                        max_length=10,
+                        verbose_name="Formato",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=50, verbose_name="Escopo")),
+                (
+                    "filters",
+                    models.JSONField(blank=True, default=dict, verbose_name="Filtros"),
+                ),
+                (
+                    "fingerprint",
+                    models.CharField(
+                        max_length=64, verbose_name="Assinatura do Pedido"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Na Fila"),
+                            ("running", "Gerando"),
+                            ("done", "Concluída"),
+                            ("failed", "Falhou"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "file_path",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Arquivo"
+                    ),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="Erro")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Criado em"),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Iniciado em"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Finalizado em"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Solicitante",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Exportação",
+                "verbose_name_plural": "Exportações",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"], name="exportjob_status_idx"
+                    ),
+                    models.Index(
+                        fields=["fingerprint", "status"],
+                        name="exportjob_fingerprint_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("status__in", ["pending", "running"])),
+                        fields=("fingerprint",),
+                        name="exportjob_unico_ativo",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0008_activitylog_timestamp_default"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ActivityLogArchive",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("created", "Lead Criado"),
+                            ("updated", "Lead Atualizado"),
+                            ("status_changed", "Status Alterado"),
+                            ("deleted", "Lead Excluído"),
+                            ("assigned", "Atendente Atribuído"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("old_value", models.TextField(blank=True, null=True)),
+                ("new_value", models.TextField(blank=True, null=True)),
+                ("description", models.TextField(blank=True, null=True)),
+                ("timestamp", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "lead",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_activities",
+                        to="leads.lead",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Log de Atividade Arquivado",
+                "verbose_name_plural": "Logs de Atividade Arquivados",
+                "ordering": ["-timestamp"],
+                "indexes": [
+                    models.Index(
+                        fields=["timestamp", "id"], name="logarchive_timestamp_idx"
+                    ),
+                    models.Index(
+                        fields=["lead", "timestamp"], name="logarchive_lead_ts_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0009_activitylogarchive"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activitylogarchive",
+            index=models.Index(
+                fields=["user", "timestamp"], name="logarchive_user_ts_idx"
+            ),
+        ),
+    ]
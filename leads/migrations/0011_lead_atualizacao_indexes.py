@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0010_activitylogarchive_user_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["data_atualizacao", "id"], name="lead_atualizacao_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["atendente", "data_atualizacao"],
+                name="lead_atendente_atualizacao_idx",
+            ),
+        ),
+    ]
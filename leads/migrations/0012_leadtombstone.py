@@ -0,0 +1,58 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0011_lead_atualizacao_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeadTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("lead_id", models.BigIntegerField()),
+                ("atendente_id", models.IntegerField(blank=True, null=True)),
+                (
+                    "motivo",
+                    models.CharField(
+                        choices=[
+                            ("excluido", "Excluído"),
+                            ("reatribuido", "Reatribuído"),
+                        ],
+                        default="excluido",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "data_exclusao",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "verbose_name": "Lead Removido",
+                "verbose_name_plural": "Leads Removidos",
+                "indexes": [
+                    models.Index(
+                        fields=["data_exclusao", "id"], name="tombstone_data_idx"
+                    ),
+                    models.Index(
+                        fields=["atendente_id", "data_exclusao", "id"],
+                        name="tombstone_atendente_data_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
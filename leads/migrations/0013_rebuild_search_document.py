@@ -0,0 +1,38 @@
+from django.db import migrations
+
+from leads.search import FTS_TABLE, SEARCH_FIELDS, build_search_document
+
+
+def rebuild_search_document(apps, schema_editor):
+    Lead = apps.get_model("leads", "Lead")
+    batch = []
+    for lead in Lead.objects.only("id", *SEARCH_FIELDS).iterator(chunk_size=2000):
+        lead.search_document = build_search_document(lead)
+        batch.append(lead)
+        if len(batch) >= 2000:
+            Lead.objects.bulk_update(batch, ["search_document"])
+            batch = []
+    if batch:
+        Lead.objects.bulk_update(batch, ["search_document"])
+
+    connection = schema_editor.connection
+    if (
+        connection.vendor == "sqlite"
+        and FTS_TABLE in connection.introspection.table_names()
+    ):
+        schema_editor.execute(f"DELETE FROM {FTS_TABLE}")
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, search_document) "
+            "SELECT id, search_document FROM leads_lead"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0012_leadtombstone"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_document, migrations.RunPython.noop),
+    ]
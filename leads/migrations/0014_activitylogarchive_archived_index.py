@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0013_rebuild_search_document"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activitylogarchive",
+            index=models.Index(fields=["archived_at"], name="logarchive_archived_idx"),
+        ),
+    ]
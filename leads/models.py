@@ -1,6 +1,14 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+from .search import SEARCH_FIELDS, build_search_document
+
+
+# Campos do lead que definem seu balde em LeadStats
+LEAD_STATS_FIELDS = ('atendente_id', 'status', 'origem', 'prioridade', 'valor_curso')
+
+
 class Lead(models.Model):
     STATUS_CHOICES = [
         ('novo', 'Novo'),
@@ -18,8 +26,7 @@ class Lead(models.Model):
         max_length=20,
         choices=STATUS_CHOICES,
         default='novo',
-        verbose_name="Status",
-        db_index=True
+        verbose_name="Status"
     )
     data_criacao = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     data_atualizacao = models.DateTimeField(auto_now=True, verbose_name="Última Atualização")
@@ -87,14 +94,56 @@ class Lead(models.Model):
         verbose_name="Observação Interna"
     )
 
+    # Nome, e-mail e curso normalizados (minúsculas, sem acentos) para a busca indexada
+    search_document = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="Documento de Busca"
+    )
+
     class Meta:
         ordering = ['-data_criacao']
         verbose_name = "Lead"
         verbose_name_plural = "Leads"
+        # Índices alinhados aos filtros da listagem, exportações, pipeline e API
+        # (ATENDENTE sempre filtra por atendente); rode `analyze_lead_queries` ao mudar filtros
+        indexes = [
+            models.Index(fields=['data_criacao', 'id'], name='lead_criacao_idx'),
+            models.Index(fields=['atendente', 'data_criacao', 'id'], name='lead_atendente_criacao_idx'),
+            models.Index(fields=['status', 'data_criacao', 'id'], name='lead_status_criacao_idx'),
+            models.Index(fields=['atendente', 'status', 'data_criacao'], name='lead_atend_status_criacao_idx'),
+            models.Index(fields=['origem', 'data_criacao'], name='lead_origem_criacao_idx'),
+            models.Index(fields=['prioridade', 'data_criacao'], name='lead_prioridade_criacao_idx'),
+            models.Index(fields=['probabilidade_fechamento'], name='lead_probabilidade_idx'),
+            # MAX(data_atualizacao) dos ETags e leitura incremental por atualização
+            models.Index(fields=['data_atualizacao', 'id'], name='lead_atualizacao_idx'),
+            models.Index(fields=['atendente', 'data_atualizacao'], name='lead_atendente_atualizacao_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nome} - {self.get_status_display()}"
 
+    def save(self, *args, **kwargs):
+        self.search_document = build_search_document(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # data_atualizacao sempre acompanha a gravação (ETags e feed de alterações)
+            extra = {'data_atualizacao'}
+            if set(SEARCH_FIELDS) & set(update_fields):
+                extra.add('search_document')
+            kwargs['update_fields'] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guardar o atendente carregado para invalidar o escopo antigo ao reatribuir
+        instance._loaded_atendente_id = instance.__dict__.get('atendente_id')
+        # Balde de LeadStats como está no banco; os sinais aplicam o delta ao gravar
+        instance._loaded_stats = {name: instance.__dict__[name] for name in LEAD_STATS_FIELDS if name in instance.__dict__}
+        return instance
+
 
 class ActivityLog(models.Model):
     ACTION_CHOICES = [
@@ -111,7 +160,8 @@ class ActivityLog(models.Model):
     old_value = models.TextField(blank=True, null=True)
     new_value = models.TextField(blank=True, null=True)
     description = models.TextField(blank=True, null=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Momento do evento (não da gravação): os logs podem ser gravados em lote depois
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     def __str__(self):
         return f"{self.user} - {self.action} - {self.lead}"
@@ -120,3 +170,164 @@ class ActivityLog(models.Model):
         ordering = ['-timestamp']
         verbose_name = "Log de Atividade"
         verbose_name_plural = "Logs de Atividade"
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='log_timestamp_idx'),
+            models.Index(fields=['lead', 'timestamp'], name='log_lead_timestamp_idx'),
+            models.Index(fields=['user', 'timestamp'], name='log_user_timestamp_idx'),
+            models.Index(fields=['action', 'timestamp'], name='log_action_timestamp_idx'),
+        ]
+
+
+
+class ActivityLogArchive(models.Model):
+    """Logs de atividade antigos movidos pelo comando ``archive_activity_logs``.
+
+    Mantém o ``id`` original e só os índices usados na consulta sob demanda,
+    para que a tabela quente (``ActivityLog``) e seus índices continuem pequenos.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='archived_activities')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    action = models.CharField(max_length=20, choices=ActivityLog.ACTION_CHOICES)
+    old_value = models.TextField(blank=True, null=True)
+    new_value = models.TextField(blank=True, null=True)
+    description = models.TextField(blank=True, null=True)
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.action} - {self.lead}"
+
+    class Meta:
+        ordering = ['-timestamp']
+        verbose_name = "Log de Atividade Arquivado"
+        verbose_name_plural = "Logs de Atividade Arquivados"
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='logarchive_timestamp_idx'),
+            models.Index(fields=['lead', 'timestamp'], name='logarchive_lead_ts_idx'),
+            models.Index(fields=['user', 'timestamp'], name='logarchive_user_ts_idx'),
+            # Último arquivamento, no ETag das listagens de logs
+            models.Index(fields=['archived_at'], name='logarchive_archived_idx'),
+        ]
+
+
+class LeadTombstone(models.Model):
+    """Registro de um lead que saiu de um escopo, para o feed de alterações da API.
+
+    ``excluido``: o lead foi apagado (vale para todos os escopos).
+    ``reatribuido``: o lead deixou a carteira de ``atendente_id`` (só esse escopo).
+    Os ids não são chaves estrangeiras: o lead e o usuário podem não existir mais.
+    """
+
+    MOTIVO_CHOICES = [
+        ('excluido', 'Excluído'),
+        ('reatribuido', 'Reatribuído'),
+    ]
+
+    lead_id = models.BigIntegerField()
+    atendente_id = models.IntegerField(null=True, blank=True)
+    motivo = models.CharField(max_length=20, choices=MOTIVO_CHOICES, default='excluido')
+    data_exclusao = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Lead #{self.lead_id} - {self.get_motivo_display()}"
+
+    class Meta:
+        verbose_name = "Lead Removido"
+        verbose_name_plural = "Leads Removidos"
+        indexes = [
+            models.Index(fields=['data_exclusao', 'id'], name='tombstone_data_idx'),
+            models.Index(fields=['atendente_id', 'data_exclusao', 'id'], name='tombstone_atendente_data_idx'),
+        ]
+
+class LeadStats(models.Model):
+    """Contagens e somas desnormalizadas de leads por atendente, status, origem e prioridade."""
+
+    atendente = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Atendente"
+    )
+    status = models.CharField(max_length=20, choices=Lead.STATUS_CHOICES, verbose_name="Status")
+    origem = models.CharField(max_length=20, choices=Lead.ORIGEM_CHOICES, verbose_name="Origem do Lead")
+    prioridade = models.CharField(max_length=10, choices=Lead.PRIORIDADE_CHOICES, verbose_name="Prioridade")
+    total = models.IntegerField(default=0, verbose_name="Total de Leads")
+    valor_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Soma do Valor do Curso")
+
+    def __str__(self):
+        return f"{self.atendente_id or '-'} / {self.status} / {self.origem} / {self.prioridade}: {self.total}"
+
+    class Meta:
+        verbose_name = "Estatística de Leads"
+        verbose_name_plural = "Estatísticas de Leads"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['atendente', 'status', 'origem', 'prioridade'],
+                name='leadstats_unique_bucket',
+            ),
+            models.UniqueConstraint(
+                fields=['status', 'origem', 'prioridade'],
+                condition=models.Q(atendente__isnull=True),
+                name='leadstats_unique_bucket_sem_atendente',
+            ),
+        ]
+
+
+class ExportJob(models.Model):
+    """Exportação de leads gerada em segundo plano pelo `run_export_worker`."""
+
+    FORMATO_CHOICES = [
+        ('xlsx', 'Excel'),
+        ('pdf', 'PDF'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Na Fila'),
+        ('running', 'Gerando'),
+        ('done', 'Concluída'),
+        ('failed', 'Falhou'),
+    ]
+
+    # Estados em que o job ainda pode receber pedidos idênticos
+    ACTIVE_STATUSES = ('pending', 'running')
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs', verbose_name="Solicitante")
+    formato = models.CharField(max_length=10, choices=FORMATO_CHOICES, verbose_name="Formato")
+    scope = models.CharField(max_length=50, verbose_name="Escopo")
+    filters = models.JSONField(default=dict, blank=True, verbose_name="Filtros")
+    fingerprint = models.CharField(max_length=64, verbose_name="Assinatura do Pedido")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Status")
+    file_path = models.CharField(max_length=255, blank=True, verbose_name="Arquivo")
+    error = models.TextField(blank=True, verbose_name="Erro")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Iniciado em")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Finalizado em")
+
+    def __str__(self):
+        return f"{self.get_formato_display()} #{self.pk} - {self.get_status_display()}"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Exportação"
+        verbose_name_plural = "Exportações"
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_idx'),
+            models.Index(fields=['fingerprint', 'status'], name='exportjob_fingerprint_idx'),
+        ]
+        constraints = [
+            # Um único job na fila/em execução por escopo + filtros + formato
+            models.UniqueConstraint(
+                fields=['fingerprint'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='exportjob_unico_ativo',
+            ),
+        ]
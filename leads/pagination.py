@@ -0,0 +1,252 @@
+import hashlib
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+
+CURSOR_SALT = 'leads.pagination.cursor'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(position, direction, filters):
+    """Gera um token opaco (assinado) com a posição, a direção e os filtros ativos."""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in position]
+    return signing.dumps({'p': values, 'd': direction, 'f': filters}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token):
+    try:
+        data = signing.loads(token, salt=CURSOR_SALT)
+        direction = data['d']
+        position = data['p']
+        filters = data['f']
+    except (signing.BadSignature, KeyError, TypeError):
+        raise InvalidCursor(token)
+    if direction not in ('next', 'prev') or not isinstance(filters, dict):
+        raise InvalidCursor(token)
+    return position, direction, filters
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Paginação por cursor (keyset) sobre uma ordenação única e estável.
+
+    Cada página é um ``WHERE (campo1, campo2) < (valor1, valor2) ORDER BY ...
+    LIMIT n + 1``: não há ``COUNT(*)`` nem ``OFFSET``, então o custo por
+    página não depende da profundidade. ``ordering`` deve terminar em uma
+    coluna única (normalmente o ``id``) e usar a mesma direção em todos os
+    campos.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-data_criacao', '-id')):
+        descending = {field.startswith('-') for field in ordering}
+        if len(descending) != 1:
+            raise ValueError('Todos os campos do keyset devem ter a mesma direção')
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.descending = descending.pop()
+
+    def _position(self, obj):
+        return [getattr(obj, field) for field in self.fields]
+
+    def _parse_position(self, values):
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor(values)
+        model = self.queryset.model
+        try:
+            return [model._meta.get_field(field).to_python(value) for field, value in zip(self.fields, values)]
+        except Exception:
+            raise InvalidCursor(values)
+
+    def _beyond(self, position, forward):
+        # Comparação lexicográfica expandida: (a > x) OR (a = x AND b > y) ...
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            step = Q(**{f'{field}__{lookup}': position[index]})
+            for previous, value in zip(self.fields[:index], position[:index]):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def page(self, cursor=None, filters=None):
+        """Retorna a página indicada pelo token ``cursor`` (ou a primeira)."""
+        filters = filters or {}
+        queryset = self.queryset
+        forward = True
+        if cursor:
+            position, direction, _filters = decode_cursor(cursor)
+            forward = direction == 'next'
+            queryset = queryset.filter(self._beyond(self._parse_position(position), forward))
+
+        if forward:
+            queryset = queryset.order_by(*self.ordering)
+        else:
+            reversed_ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+            queryset = queryset.order_by(*reversed_ordering)
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or not forward:
+                next_cursor = encode_cursor(self._position(rows[-1]), 'next', filters)
+            if (has_more and not forward) or (forward and cursor):
+                previous_cursor = encode_cursor(self._position(rows[0]), 'prev', filters)
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+
+def estimate_count(queryset):
+    """Estimativa do planejador para o total de linhas (só PostgreSQL; senão None).
+
+    Sem filtros usa ``pg_class.reltuples``; com filtros, o ``Plan Rows`` do
+    ``EXPLAIN``. Nenhum dos dois percorre a tabela.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    queryset = queryset.order_by()
+    with connection.cursor() as cursor:
+        if not queryset.query.where and not queryset.query.distinct:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # reltuples = -1 enquanto a tabela nunca foi analisada
+            return int(row[0]) if row and row[0] >= 0 else None
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_cache_key(queryset):
+    """Assinatura do filtro: hash do SQL (sem ordenação) e dos parâmetros."""
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.sha256(f'{queryset.db}|{sql}|{params!r}'.encode()).hexdigest()
+    return f'leads:count:{digest}'
+
+
+class ApproximateCountPaginator(Paginator):
+    """Paginator que evita ``COUNT(*)`` exato em conjuntos grandes.
+
+    Usa a estimativa do planejador quando ela passa de ``exact_threshold``
+    e o ``COUNT(*)`` exato abaixo disso (ou quando não há estimativa). O
+    total fica em cache por assinatura de filtro durante ``cache_timeout``
+    segundos. Ao chegar a uma página incompleta o total exato passa a ser
+    conhecido e substitui a estimativa (também no cache); uma página vazia
+    além do fim real conta de verdade e levanta ``EmptyPage``, e o
+    ``get_page`` cai na última página.
+    """
+
+    def __init__(self, object_list, per_page, exact_threshold=None, cache_timeout=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.exact_threshold = settings.APPROX_COUNT_THRESHOLD if exact_threshold is None else exact_threshold
+        self.cache_timeout = settings.APPROX_COUNT_CACHE_TIMEOUT if cache_timeout is None else cache_timeout
+        self.is_approximate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+        key = count_cache_key(queryset)
+        cached = cache.get(key)
+        if cached is not None:
+            self.is_approximate = cached['approximate']
+            return cached['count']
+
+        total = estimate_count(queryset)
+        self.is_approximate = total is not None and total >= self.exact_threshold
+        if not self.is_approximate:
+            total = queryset.count()
+        cache.set(key, {'count': total, 'approximate': self.is_approximate}, self.cache_timeout)
+        return total
+
+    def page(self, number):
+        page = super().page(number)
+        page.object_list = list(page.object_list)
+        rows = len(page.object_list)
+        if self.is_approximate and rows < self.per_page:
+            if rows or page.number == 1:
+                # Última página real: o total exato é conhecido sem COUNT(*)
+                self._set_exact_count((page.number - 1) * self.per_page + rows)
+            else:
+                # Estimativa alta demais: a página fica além do fim real
+                self._set_exact_count(self.object_list.count())
+                raise EmptyPage(self.error_messages['no_results'])
+        return page
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # Página vazia além do fim real: o total já foi corrigido em page()
+            return self.page(self.num_pages)
+
+    def _set_exact_count(self, total):
+        self.__dict__['count'] = total
+        self.__dict__.pop('num_pages', None)
+        self.is_approximate = False
+        cache.set(count_cache_key(self.object_list), {'count': total, 'approximate': False}, self.cache_timeout)
+
+
+class BoundedCursorPagination(CursorPagination):
+    """Paginação por cursor da API: sem COUNT nem OFFSET profundo.
+
+    ``?page_size=`` é opcional e limitado a ``API_MAX_PAGE_SIZE``.
+    """
+
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering = ('-id',)
+
+
+class LeadCursorPagination(BoundedCursorPagination):
+    ordering = ('-data_criacao', '-id')
+
+
+class ActivityLogCursorPagination(BoundedCursorPagination):
+    ordering = ('-timestamp', '-id')
@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ActivityLog, Lead
+
+
+ROLE_CACHE_PREFIX = "crm:roles:v1"
+
+# Perfis que veem e atribuem leads de todos os atendentes
+MANAGER_GROUPS = frozenset({"ADMIN", "GESTOR"})
+
+
+@dataclass(frozen=True)
+class CrmRole:
+    """Grupos do usuário resolvidos uma vez e guardados no cache."""
+
+    user_id: int | None
+    groups: frozenset = frozenset()
+
+    @property
+    def is_atendente(self):
+        return "ATENDENTE" in self.groups
+
+    @property
+    def is_manager(self):
+        return bool(self.groups & MANAGER_GROUPS)
+
+    @property
+    def scope(self):
+        # ATENDENTE vê apenas os próprios leads; demais perfis compartilham o escopo global
+        return f"atendente:{self.user_id}" if self.is_atendente else "all"
+
+    def can_access(self, lead):
+        return not self.is_atendente or lead.atendente_id == self.user_id
+
+
+def role_cache_key(user_id):
+    return f"{ROLE_CACHE_PREFIX}:{user_id}"
+
+
+def get_user_role(user):
+    """Retorna o papel do usuário do cache, consultando os grupos só no miss.
+
+    Os sinais limpam o cache do processo atual; nos demais workers (cache
+    locmem) o papel antigo vale até ``ROLE_CACHE_TIMEOUT`` segundos.
+    """
+    if not user.is_authenticated:
+        return CrmRole(user_id=None)
+    key = role_cache_key(user.pk)
+    role = cache.get(key)
+    if role is None:
+        role = CrmRole(user_id=user.pk, groups=frozenset(user.groups.values_list("name", flat=True)))
+        cache.set(key, role, settings.ROLE_CACHE_TIMEOUT)
+    return role
+
+
+def invalidate_user_roles(*user_ids):
+    cache.delete_many([role_cache_key(user_id) for user_id in user_ids if user_id is not None])
+
+
+def request_role(request):
+    """Papel de quem fez a requisição (HttpRequest ou Request do DRF).
+
+    Usa ``request.crm_role`` do middleware; no DRF o usuário pode vir de
+    outra autenticação (ex.: Basic), então o papel é resolvido para ele.
+    """
+    role = getattr(request, "crm_role", None)
+    if role is None or role.user_id != request.user.pk:
+        role = get_user_role(request.user)
+    return role
+
+
+def scoped_leads(request, leads=None):
+    """Leads visíveis para o usuário da requisição."""
+    leads = Lead.objects.all() if leads is None else leads
+    role = request_role(request)
+    if role.is_atendente:
+        leads = leads.filter(atendente_id=role.user_id)
+    return leads
+
+
+def scoped_activity_logs(request, logs=None):
+    """Logs de atividade visíveis para o usuário da requisição."""
+    logs = ActivityLog.objects.all() if logs is None else logs
+    role = request_role(request)
+    if role.is_atendente:
+        logs = logs.filter(lead__atendente_id=role.user_id)
+    return logs
@@ -0,0 +1,114 @@
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+# Campos do lead que compõem o documento de busca
+SEARCH_FIELDS = ('nome', 'email', 'curso_interesse')
+
+FTS_TABLE = 'leads_lead_fts'
+
+# Mesma expressão do índice GIN criado na migração (PostgreSQL)
+PG_DOCUMENT_SQL = "to_tsvector('simple'::regconfig, \"leads_lead\".\"search_document\")"
+
+# Letras e dígitos; '@', '.', '_' e '-' separam termos. Documento e busca usam
+# a mesma quebra: o parser do PostgreSQL manteria 'joao@gmail.com' como um
+# único lexema de e-mail, que a busca por termos nunca encontraria
+_TERM_RE = re.compile(r'[^\W_]+')
+
+
+def normalize_search_text(text):
+    """Minúsculas e sem acentos: 'João Conceição' -> 'joao conceicao'."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def build_search_document(lead):
+    return ' '.join(term for field in SEARCH_FIELDS for term in search_terms(getattr(lead, field)))
+
+
+def search_terms(query):
+    return _TERM_RE.findall(normalize_search_text(query))
+
+
+def fts_available(connection):
+    """Indica se a tabela FTS5 existe neste banco SQLite (verificado uma vez por conexão)."""
+    if connection.vendor != 'sqlite':
+        return False
+    available = getattr(connection, '_leads_fts_available', None)
+    if available is None:
+        with connection.cursor() as cursor:
+            available = FTS_TABLE in connection.introspection.table_names(cursor)
+        connection._leads_fts_available = available
+    return available
+
+
+def search_leads(leads, query, rank=False):
+    """Filtra ``leads`` pelos termos de ``query`` (prefixo, sem acentos, todos obrigatórios).
+
+    Com ``rank=True`` anota ``search_rank`` (maior = mais relevante; constante
+    quando não há termos ou ranking no banco). PostgreSQL usa o índice GIN de
+    ``to_tsvector``, SQLite a tabela FTS5 e os demais bancos caem para
+    ``LIKE`` sobre ``search_document``.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return leads.annotate(search_rank=Value(0.0, output_field=FloatField())) if rank else leads
+
+    connection = connections[leads.db]
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        leads = leads.filter(RawSQL(
+            f"{PG_DOCUMENT_SQL} @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField()
+        ))
+        if rank:
+            leads = leads.annotate(search_rank=RawSQL(
+                f"ts_rank({PG_DOCUMENT_SQL}, to_tsquery('simple', %s))", [tsquery], output_field=FloatField()
+            ))
+        return leads
+
+    if fts_available(connection):
+        match = ' '.join(f'"{term}"*' for term in terms)
+        if rank:
+            # JOIN com a tabela FTS5: o MATCH roda uma vez e o rank (bm25, quanto
+            # menor mais relevante) vem da mesma linha; uma subconsulta por lead
+            # repetiria o MATCH para cada candidato
+            return leads.extra(
+                select={'search_rank': f'-{FTS_TABLE}.rank'},
+                tables=[FTS_TABLE],
+                where=[f'{FTS_TABLE}.rowid = "leads_lead"."id"', f'{FTS_TABLE} MATCH %s'],
+                params=[match],
+            )
+        return leads.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+        ))
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(search_document__contains=term)
+    leads = leads.filter(condition)
+    if rank:
+        leads = leads.annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return leads
+
+
+def sync_search_index(leads, using='default'):
+    """Atualiza a tabela FTS5 (SQLite) para os leads informados."""
+    connection = connections[using]
+    if not fts_available(connection):
+        return
+    rows = [(lead.pk, lead.search_document) for lead in leads]
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk, _document in rows])
+        cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, search_document) VALUES (%s, %s)', rows)
+
+
+def remove_from_search_index(lead_ids, using='default'):
+    connection = connections[using]
+    if not fts_available(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in lead_ids])
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Lead, ActivityLog
+from .roles import request_role
 
 
 class LeadSerializer(serializers.ModelSerializer):
@@ -19,6 +20,13 @@ class LeadSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'data_criacao']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # ATENDENTE só pode atribuir a si mesmo, como no LeadForm (vale também para cada item do lote)
+        request = self.context.get('request')
+        if request is not None and request_role(request).is_atendente:
+            self.fields['atendente'].queryset = self.fields['atendente'].queryset.filter(pk=request.user.pk)
+
 
 class ActivityLogSerializer(serializers.ModelSerializer):
     lead_nome = serializers.CharField(source='lead.nome', read_only=True)
@@ -32,4 +40,97 @@ class ActivityLogSerializer(serializers.ModelSerializer):
             'action', 'action_display', 'old_value', 'new_value',
             'description', 'timestamp'
         ]
-        read_only_fields = ['id', 'timestamp']
\ No newline at end of file
+        read_only_fields = ['id', 'timestamp']
+
+# Leitura rápida para as listagens da API: values() com os nomes via JOIN e
+# rótulos de dicionários pré-calculados, gerando dicts com a mesma saída dos
+# ModelSerializers acima sem instanciar modelos nem percorrer os campos do DRF.
+
+LEAD_LIST_VALUES = (
+    'id', 'nome', 'telefone', 'email', 'curso_interesse', 'origem', 'prioridade',
+    'probabilidade_fechamento', 'valor_curso', 'atendente', 'atendente__first_name',
+    'atendente__last_name', 'status', 'data_criacao', 'data_proximo_contato', 'observacao_interna',
+)
+
+ACTIVITY_LOG_LIST_VALUES = (
+    'id', 'lead', 'lead__nome', 'user', 'user__first_name', 'user__last_name',
+    'action', 'old_value', 'new_value', 'description', 'timestamp',
+)
+
+
+def _full_name(first_name, last_name):
+    # Mesmo resultado de User.get_full_name()
+    return f'{first_name} {last_name}'.strip()
+
+
+def lead_list_values(queryset):
+    return queryset.values(*LEAD_LIST_VALUES)
+
+
+def serialize_lead_rows(rows):
+    """Converte linhas de ``lead_list_values`` na saída do ``LeadSerializer``."""
+    fields = LeadSerializer().fields
+    valor_curso = fields['valor_curso'].to_representation
+    data_criacao = fields['data_criacao'].to_representation
+    data_proximo_contato = fields['data_proximo_contato'].to_representation
+    status_labels = dict(Lead.STATUS_CHOICES)
+    origem_labels = dict(Lead.ORIGEM_CHOICES)
+    prioridade_labels = dict(Lead.PRIORIDADE_CHOICES)
+
+    data = []
+    for row in rows:
+        item = {
+            'id': row['id'],
+            'nome': row['nome'],
+            'telefone': row['telefone'],
+            'email': row['email'],
+            'curso_interesse': row['curso_interesse'],
+            'origem': row['origem'],
+            'origem_display': origem_labels.get(row['origem'], row['origem']),
+            'prioridade': row['prioridade'],
+            'prioridade_display': prioridade_labels.get(row['prioridade'], row['prioridade']),
+            'probabilidade_fechamento': row['probabilidade_fechamento'],
+            'valor_curso': valor_curso(row['valor_curso']),
+            'atendente': row['atendente'],
+            'atendente_nome': _full_name(row['atendente__first_name'], row['atendente__last_name']),
+            'status': row['status'],
+            'status_display': status_labels.get(row['status'], row['status']),
+            'data_criacao': data_criacao(row['data_criacao']),
+            'data_proximo_contato': data_proximo_contato(row['data_proximo_contato']),
+            'observacao_interna': row['observacao_interna'],
+        }
+        if row['atendente'] is None:
+            # O ModelSerializer omite o campo quando não há atendente
+            del item['atendente_nome']
+        data.append(item)
+    return data
+
+
+def activity_log_list_values(queryset):
+    return queryset.values(*ACTIVITY_LOG_LIST_VALUES)
+
+
+def serialize_activity_log_rows(rows):
+    """Converte linhas de ``activity_log_list_values`` na saída do ``ActivityLogSerializer``."""
+    timestamp = ActivityLogSerializer().fields['timestamp'].to_representation
+    action_labels = dict(ActivityLog.ACTION_CHOICES)
+
+    data = []
+    for row in rows:
+        item = {
+            'id': row['id'],
+            'lead': row['lead'],
+            'lead_nome': row['lead__nome'],
+            'user': row['user'],
+            'user_nome': _full_name(row['user__first_name'], row['user__last_name']),
+            'action': row['action'],
+            'action_display': action_labels.get(row['action'], row['action']),
+            'old_value': row['old_value'],
+            'new_value': row['new_value'],
+            'description': row['description'],
+            'timestamp': timestamp(row['timestamp']),
+        }
+        if row['user'] is None:
+            del item['user_nome']
+        data.append(item)
+    return data
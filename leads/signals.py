@@ -0,0 +1,83 @@
+from dataclasses import asdict
+
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Lead, LeadTombstone
+from .roles import invalidate_user_roles
+from .search import remove_from_search_index, sync_search_index
+from .stats import (
+    invalidate_dashboard_stats, release_atendente_stats, snapshot_lead, stored_snapshot, update_lead_stats,
+)
+
+
+@receiver(pre_save, sender=Lead)
+def lead_saving(sender, instance, **kwargs):
+    # Balde antigo antes da gravação; views, API e admin passam todos por aqui
+    instance._stats_before = None if instance._state.adding else stored_snapshot(instance, kwargs['using'])
+
+
+@receiver(post_save, sender=Lead)
+def lead_saved(sender, instance, created, **kwargs):
+    old, new = instance.__dict__.pop('_stats_before', None), snapshot_lead(instance)
+    if old != new:
+        update_lead_stats(old, new)
+    instance._loaded_stats = asdict(new)
+    # Invalidar só após o commit, quando LeadStats já reflete a alteração
+    atendente_ids = (instance.atendente_id, getattr(instance, '_loaded_atendente_id', None))
+    old_atendente_id = atendente_ids[1]
+    if not created and old_atendente_id is not None and old_atendente_id != instance.atendente_id:
+        # O lead saiu da carteira do atendente anterior (feed de alterações)
+        LeadTombstone.objects.using(kwargs['using']).create(
+            lead_id=instance.pk, atendente_id=old_atendente_id, motivo='reatribuido',
+        )
+    transaction.on_commit(lambda: invalidate_dashboard_stats(*atendente_ids))
+    instance._loaded_atendente_id = instance.atendente_id
+    sync_search_index([instance], using=kwargs['using'])
+
+
+@receiver(pre_delete, sender=Lead)
+def lead_deleting(sender, instance, **kwargs):
+    instance._stats_before = stored_snapshot(instance, kwargs['using'])
+
+
+@receiver(post_delete, sender=Lead)
+def lead_deleted(sender, instance, **kwargs):
+    old = instance.__dict__.pop('_stats_before', None)
+    if old is not None:
+        update_lead_stats(old=old)
+    remove_from_search_index([instance.pk], using=kwargs['using'])
+    atendente_ids = (instance.atendente_id, getattr(instance, '_loaded_atendente_id', None))
+    LeadTombstone.objects.using(kwargs['using']).create(
+        lead_id=instance.pk,
+        atendente_id=getattr(instance, '_loaded_atendente_id', instance.atendente_id),
+        motivo='excluido',
+    )
+    transaction.on_commit(lambda: invalidate_dashboard_stats(*atendente_ids))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse=True: alteração feita pelo grupo (group.user_set), pk_set traz usuários
+    if action in ('post_add', 'post_remove'):
+        user_ids = pk_set if reverse else [instance.pk]
+    elif action == 'pre_clear':
+        user_ids = list(instance.user_set.values_list('pk', flat=True)) if reverse else [instance.pk]
+    else:
+        return
+    transaction.on_commit(lambda: invalidate_user_roles(*user_ids))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    user_ids = list(instance.user_set.values_list('pk', flat=True))
+    transaction.on_commit(lambda: invalidate_user_roles(*user_ids))
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # Os leads do atendente ficam sem atendente (SET_NULL em lote, sem sinais por lead)
+    release_atendente_stats(instance.pk)
+    transaction.on_commit(lambda: invalidate_dashboard_stats(instance.pk))
@@ -0,0 +1,324 @@
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import LEAD_STATS_FIELDS, Lead, LeadStats
+
+
+@dataclass(frozen=True)
+class AtendenteRanking:
+    username: str
+    first_name: str
+    last_name: str
+    convertidos: int
+
+
+@dataclass(frozen=True)
+class DashboardStats:
+    total_leads: int
+    novos: int
+    progresso: int
+    convertidos: int
+    ticket_medio: Decimal
+    faturamento_total: Decimal
+    status_counts: dict = field(default_factory=dict)
+    origem_counts: dict = field(default_factory=dict)
+    atendente_ranking: list = field(default_factory=list)
+    ultimos_leads: list = field(default_factory=list)
+
+    @property
+    def status_labels(self):
+        labels = dict(Lead.STATUS_CHOICES)
+        return json.dumps([labels[key] for key in self.status_counts])
+
+    @property
+    def status_data(self):
+        return json.dumps(list(self.status_counts.values()))
+
+    @property
+    def origem_labels(self):
+        labels = dict(Lead.ORIGEM_CHOICES)
+        return json.dumps([labels[key] for key in self.origem_counts])
+
+    @property
+    def origem_data(self):
+        return json.dumps(list(self.origem_counts.values()))
+
+
+def _status_alias(key):
+    return f"status_{key}"
+
+
+def _origem_alias(key):
+    return f"origem_{key}"
+
+
+def compute_dashboard_stats(atendente=None, ranking_size=5, ultimos_size=5):
+    """Calcula cards e séries dos gráficos do dashboard a partir de LeadStats.
+
+    Todos os totais saem de um único SELECT com agregações condicionais
+    sobre a tabela desnormalizada; o ranking de atendentes é o segundo
+    GROUP BY e os últimos leads uma leitura limitada.
+    """
+    buckets = LeadStats.objects.all()
+    leads = Lead.objects.all()
+    if atendente is not None:
+        buckets = buckets.filter(atendente=atendente)
+        leads = leads.filter(atendente=atendente)
+
+    aggregates = {
+        "total_leads": Sum("total"),
+        "valor_soma": Sum("valor_total"),
+        "faturamento_total": Sum("valor_total", filter=Q(status="convertido")),
+    }
+    for key, _label in Lead.STATUS_CHOICES:
+        aggregates[_status_alias(key)] = Sum("total", filter=Q(status=key))
+    for key, _label in Lead.ORIGEM_CHOICES:
+        aggregates[_origem_alias(key)] = Sum("total", filter=Q(origem=key))
+
+    totals = {alias: value or 0 for alias, value in buckets.order_by().aggregate(**aggregates).items()}
+
+    # Gráficos mostram apenas as categorias presentes
+    status_counts = {
+        key: totals[_status_alias(key)]
+        for key, _label in Lead.STATUS_CHOICES
+        if totals[_status_alias(key)]
+    }
+    origem_counts = dict(
+        sorted(
+            (
+                (key, totals[_origem_alias(key)])
+                for key, _label in Lead.ORIGEM_CHOICES
+                if totals[_origem_alias(key)]
+            ),
+            key=lambda item: -item[1],
+        )
+    )
+
+    ranking = (
+        buckets.filter(atendente__isnull=False)
+        .values("atendente__username", "atendente__first_name", "atendente__last_name")
+        .annotate(convertidos=Coalesce(Sum("total", filter=Q(status="convertido")), 0))
+        .order_by("-convertidos")[:ranking_size]
+    )
+
+    return DashboardStats(
+        total_leads=totals["total_leads"],
+        novos=totals[_status_alias("novo")],
+        progresso=totals[_status_alias("progresso")],
+        convertidos=totals[_status_alias("convertido")],
+        ticket_medio=totals["valor_soma"] / totals["total_leads"] if totals["total_leads"] else 0,
+        faturamento_total=totals["faturamento_total"],
+        status_counts=status_counts,
+        origem_counts=origem_counts,
+        atendente_ranking=[
+            AtendenteRanking(
+                username=row["atendente__username"],
+                first_name=row["atendente__first_name"],
+                last_name=row["atendente__last_name"],
+                convertidos=row["convertidos"],
+            )
+            for row in ranking
+        ],
+        ultimos_leads=list(leads.order_by("-data_criacao")[:ultimos_size]),
+    )
+
+
+def lead_status_counts(atendente=None):
+    """Total de leads por status, lido de LeadStats (usado nos badges do Kanban)."""
+    buckets = LeadStats.objects.all()
+    if atendente is not None:
+        buckets = buckets.filter(atendente=atendente)
+    rows = buckets.order_by().values("status").annotate(count=Sum("total"))
+    return {row["status"]: row["count"] for row in rows}
+
+
+DASHBOARD_CACHE_PREFIX = "crm:dashboard:v1"
+
+
+def dashboard_cache_key(scope):
+    return f"{DASHBOARD_CACHE_PREFIX}:{scope}"
+
+
+def get_dashboard_stats(role):
+    """Retorna as estatísticas do escopo do papel (``CrmRole``), calculando no miss."""
+    key = dashboard_cache_key(role.scope)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_dashboard_stats(atendente=role.user_id if role.is_atendente else None)
+        cache.set(key, stats, settings.DASHBOARD_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_dashboard_stats(*atendente_ids):
+    """Remove o escopo global e os escopos dos atendentes afetados."""
+    keys = [dashboard_cache_key("all")]
+    keys += [
+        dashboard_cache_key(f"atendente:{atendente_id}")
+        for atendente_id in set(atendente_ids)
+        if atendente_id is not None
+    ]
+    cache.delete_many(keys)
+
+
+@dataclass(frozen=True)
+class LeadSnapshot:
+    atendente_id: int
+    status: str
+    origem: str
+    prioridade: str
+    valor_curso: Decimal
+
+    @property
+    def bucket(self):
+        return (self.atendente_id, self.status, self.origem, self.prioridade)
+
+
+def snapshot_lead(lead):
+    """Captura os campos que compõem o balde de LeadStats de um lead."""
+    return LeadSnapshot(
+        atendente_id=lead.atendente_id,
+        status=lead.status,
+        origem=lead.origem,
+        prioridade=lead.prioridade,
+        valor_curso=Decimal(lead.valor_curso or 0),
+    )
+
+
+def stored_snapshot(lead, using=None):
+    """Balde do lead como está no banco (carregado em ``from_db`` ou lido pelo pk).
+
+    Só consulta o banco quando algum campo do balde veio adiado (``only``/``defer``).
+    """
+    values = getattr(lead, "_loaded_stats", {})
+    if len(values) < len(LEAD_STATS_FIELDS):
+        values = Lead.objects.using(using).filter(pk=lead.pk).values(*LEAD_STATS_FIELDS).first()
+        if values is None:
+            return None
+    return LeadSnapshot(**{**values, "valor_curso": Decimal(values["valor_curso"] or 0)})
+
+
+def _bump_bucket(bucket, total, valor):
+    atendente_id, status, origem, prioridade = bucket
+    rows = LeadStats.objects.filter(
+        atendente_id=atendente_id, status=status, origem=origem, prioridade=prioridade
+    )
+    changes = {"total": F("total") + total, "valor_total": F("valor_total") + valor}
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            LeadStats.objects.create(
+                atendente_id=atendente_id,
+                status=status,
+                origem=origem,
+                prioridade=prioridade,
+                total=total,
+                valor_total=valor,
+            )
+    except IntegrityError:
+        # Outro processo criou o balde entre o UPDATE e o INSERT
+        rows.update(**changes)
+
+
+def apply_lead_stats_changes(changes):
+    """Aplica em LeadStats uma sequência de pares (antes, depois).
+
+    Cada lado é um LeadSnapshot ou None (criação/exclusão). Os deltas são
+    somados por balde antes de tocar o banco, então lotes grandes geram
+    no máximo um UPDATE por balde afetado.
+    """
+    deltas = defaultdict(lambda: [0, Decimal(0)])
+    for old, new in changes:
+        if old is not None:
+            deltas[old.bucket][0] -= 1
+            deltas[old.bucket][1] -= old.valor_curso
+        if new is not None:
+            deltas[new.bucket][0] += 1
+            deltas[new.bucket][1] += new.valor_curso
+
+    with transaction.atomic():
+        for bucket, (total, valor) in sorted(deltas.items(), key=lambda item: str(item[0])):
+            if total or valor:
+                _bump_bucket(bucket, total, valor)
+
+
+def update_lead_stats(old=None, new=None):
+    apply_lead_stats_changes([(old, new)])
+
+
+def release_atendente_stats(atendente_id):
+    """Passa os baldes do atendente para "sem atendente".
+
+    Ao excluir o usuário, ``Lead.atendente`` vira NULL por um UPDATE em lote
+    (SET_NULL), sem ``save()`` nem sinais por lead.
+    """
+    buckets = LeadStats.objects.filter(atendente_id=atendente_id)
+    with transaction.atomic():
+        for status, origem, prioridade, total, valor in buckets.values_list(
+            "status", "origem", "prioridade", "total", "valor_total"
+        ):
+            if total or valor:
+                _bump_bucket((None, status, origem, prioridade), total, valor)
+        buckets.delete()
+
+
+def _bucket_key(row):
+    return (row["atendente_id"], row["status"], row["origem"], row["prioridade"])
+
+
+def expected_lead_stats():
+    """Recalcula os baldes diretamente de Lead (varredura completa)."""
+    rows = (
+        Lead.objects.order_by()
+        .values("atendente_id", "status", "origem", "prioridade")
+        .annotate(total=Count("id"), valor_total=Sum("valor_curso"))
+    )
+    return {_bucket_key(row): (row["total"], row["valor_total"] or Decimal(0)) for row in rows}
+
+
+def current_lead_stats():
+    rows = LeadStats.objects.values("atendente_id", "status", "origem", "prioridade", "total", "valor_total")
+    return {
+        _bucket_key(row): (row["total"], row["valor_total"])
+        for row in rows
+        if row["total"] or row["valor_total"]
+    }
+
+
+def lead_stats_drift():
+    """Lista (balde, esperado, atual) para cada divergência entre LeadStats e Lead."""
+    expected = expected_lead_stats()
+    current = current_lead_stats()
+    zero = (0, Decimal(0))
+    return [
+        (bucket, expected.get(bucket, zero), current.get(bucket, zero))
+        for bucket in sorted(set(expected) | set(current), key=str)
+        if expected.get(bucket, zero) != current.get(bucket, zero)
+    ]
+
+
+def rebuild_lead_stats():
+    """Substitui todo o conteúdo de LeadStats pelo recálculo a partir de Lead."""
+    expected = expected_lead_stats()
+    with transaction.atomic():
+        LeadStats.objects.all().delete()
+        LeadStats.objects.bulk_create(
+            LeadStats(
+                atendente_id=atendente_id,
+                status=status,
+                origem=origem,
+                prioridade=prioridade,
+                total=total,
+                valor_total=valor_total,
+            )
+            for (atendente_id, status, origem, prioridade), (total, valor_total) in expected.items()
+        )
+    return len(expected)
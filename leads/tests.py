@@ -0,0 +1,503 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .archive import archive_activity_logs
+from .audit import AuditLogWriter
+from .benchmarking import Scenario, consume, default_scenarios, ensure_benchmark_users, logged_in_clients
+from .management.commands.analyze_lead_queries import explain, full_scans
+from .models import ActivityLog, Lead, LeadStats
+from .pagination import ApproximateCountPaginator, count_cache_key
+from .search import fts_available, search_leads
+from .stats import compute_dashboard_stats, lead_stats_drift
+from .views import first_cards_per_status
+
+
+# Consultas SQL por requisição com o cache aquecido, contando sessão e
+# usuário. Não dependem da quantidade de leads: uma consulta por linha (N+1)
+# muda o número em uma das escalas e quebra o teste.
+QUERY_BUDGETS = {
+    'dashboard': 2,
+    'dashboard ATENDENTE': 2,
+    'lead_list': 4,
+    'lead_list ATENDENTE': 4,
+    'lead_list status': 4,
+    'lead_list status+origem+prioridade': 4,
+    'lead_list período': 4,
+    'lead_list busca': 4,
+    'lead_list ordem nome': 4,
+    # + atendentes ativos para a reatribuição em lote
+    'lead_pipeline': 5,
+    'lead_pipeline ATENDENTE': 4,
+    'activity_logs': 4,
+    'activity_logs ação+período': 4,
+    'activity_logs ATENDENTE': 4,
+    # + última remoção do escopo no ETag
+    'api leads': 5,
+    'api leads status': 5,
+    'api leads ATENDENTE': 5,
+    'api activity-logs': 4,
+    'export xlsx': 3,
+    'export pdf': 3,
+    'lead_detail': 4,
+    'api lead': 4,
+    'api leads changes': 4,
+}
+
+
+def seed_leads(qtd, seed=1):
+    call_command('seed_leads', qtd=qtd, atendentes=3, seed=seed, stdout=StringIO())
+
+
+def create_user(username, group_name):
+    user = User.objects.create_user(username=username, password=f'{username}123')
+    user.groups.add(Group.objects.get(name=group_name))
+    return user
+
+
+class DashboardQueryBudgetTests(TestCase):
+    """O dashboard não pode voltar a fazer uma consulta por card ou por lead."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('create_groups', stdout=StringIO())
+        cls.gestor = create_user('gestor', 'GESTOR')
+        seed_leads(50)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.gestor)
+
+    def test_aggregation_runs_three_queries(self):
+        # Cards e séries, ranking de atendentes e últimos leads
+        with self.assertNumQueries(3):
+            compute_dashboard_stats()
+
+    def test_dashboard_view_budget(self):
+        # Sessão, usuário, grupos do papel e as três consultas da agregação
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+        # Com o cache aquecido sobram só sessão e usuário
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+
+class QueryBudgetTestMixin:
+    """Orçamento de consultas de cada view e endpoint; as subclasses definem ``leads``."""
+
+    leads = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = ensure_benchmark_users()
+        seed_leads(cls.leads)
+        # A busca dos cenários ('maria') precisa de resultado em qualquer escala
+        lead = Lead.objects.order_by('id').first()
+        lead.nome = 'Maria Teste'
+        lead.save()
+        lead_id = lead.pk
+        cls.scenarios = default_scenarios(export_days=3650) + [
+            Scenario('lead_detail', 'gestor', f'/leads/{lead_id}/'),
+            Scenario('api lead', 'gestor', f'/api/leads/{lead_id}/'),
+            Scenario('api leads changes', 'gestor', '/api/leads/changes/'),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.clients = logged_in_clients(self.users)
+
+    def test_query_budgets(self):
+        for scenario in self.scenarios:
+            with self.subTest(scenario.name):
+                self.assertIn(scenario.name, QUERY_BUDGETS)
+                client = self.clients[scenario.user]
+                # Aquece papel, estatísticas e contagens em cache
+                consume(client.get(scenario.url))
+                with self.assertNumQueries(QUERY_BUDGETS[scenario.name]):
+                    response = client.get(scenario.url)
+                    consume(response)
+                self.assertEqual(response.status_code, 200)
+
+
+class SmallDatasetQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    # Menos leads que uma página: N+1 aparece como diferença entre as escalas
+    leads = 5
+
+
+class LargeDatasetQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    leads = 60
+
+
+class AuditLogWriterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_leads(3)
+        cls.lead = Lead.objects.first()
+
+    def pending_writer(self, quantidade, **kwargs):
+        writer = AuditLogWriter(**kwargs)
+        writer._pending = [
+            ActivityLog(lead=self.lead, action='updated', description=f'log {numero}') for numero in range(quantidade)
+        ]
+        return writer
+
+    def test_failed_batch_is_requeued_and_retried(self):
+        writer = self.pending_writer(3)
+        with mock.patch.object(ActivityLog.objects, 'bulk_create', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                writer.flush()
+        self.assertEqual([entry.description for entry in writer._pending], ['log 0', 'log 1', 'log 2'])
+
+        self.assertEqual(writer.flush(), 3)
+        self.assertEqual(ActivityLog.objects.filter(description__startswith='log ').count(), 3)
+        self.assertEqual(writer._pending, [])
+
+    def test_requeue_keeps_the_queue_bounded(self):
+        writer = self.pending_writer(3, max_pending=4)
+
+        def locked(entries):
+            # Logs que chegam durante a gravação que vai falhar
+            writer._pending += [ActivityLog(lead=self.lead, action='updated', description=f'novo {numero}') for numero in range(2)]
+            raise OperationalError('database is locked')
+
+        with mock.patch.object(ActivityLog.objects, 'bulk_create', side_effect=locked):
+            with self.assertRaises(OperationalError), self.assertLogs('leads.audit', 'ERROR'):
+                writer.flush()
+        # O lote devolvido vem antes dos novos; o mais antigo é descartado
+        self.assertEqual([entry.description for entry in writer._pending], ['log 1', 'log 2', 'novo 0', 'novo 1'])
+
+
+class LeadApiAssignmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('create_groups', stdout=StringIO())
+        cls.atendente = create_user('ana', 'ATENDENTE')
+        cls.outro = create_user('bruno', 'ATENDENTE')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.atendente)
+
+    def lead_data(self, **extra):
+        return {'nome': 'Lead API', 'telefone': '11999990000', 'curso_interesse': 'Direito', **extra}
+
+    def test_atendente_cannot_bulk_create_for_another_atendente(self):
+        items = [self.lead_data(atendente=self.atendente.pk), self.lead_data(atendente=self.outro.pk)]
+        response = self.client.post('/api/leads/bulk/', items, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1])
+        self.assertFalse(Lead.objects.filter(atendente=self.outro).exists())
+
+    def test_atendente_cannot_create_for_another_atendente(self):
+        response = self.client.post('/api/leads/', self.lead_data(atendente=self.outro.pk), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('atendente', response.json())
+
+
+class ActivityLogEtagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('create_groups', stdout=StringIO())
+        cls.gestor = create_user('gestor', 'GESTOR')
+        cls.leads = [Lead.objects.create(nome=f'Lead {numero}', telefone='11999990000') for numero in range(3)]
+        cls.logs = [
+            ActivityLog.objects.create(
+                lead=lead, action='created', timestamp=timezone.now() - timedelta(days=400 - numero)
+            )
+            for numero, lead in enumerate(cls.leads)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.gestor)
+
+    def list_etag(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/activity-logs/', HTTP_IF_NONE_MATCH='"x"')
+        self.assertFalse(any('COUNT(' in query['sql'] for query in ctx.captured_queries))
+        return response['ETag']
+
+    def test_list_etag_follows_archiving_and_deletion(self):
+        etag = self.list_etag()
+        self.assertEqual(self.client.get('/api/activity-logs/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Arquiva só o log mais antigo: o maior id da tabela quente não muda
+        archive_activity_logs(self.logs[0].timestamp + timedelta(seconds=1))
+        archived = self.list_etag()
+        self.assertNotEqual(archived, etag)
+
+        self.leads[1].delete()
+        self.assertNotEqual(self.list_etag(), archived)
+
+    def test_detail_etag_reads_only_the_row(self):
+        url = f'/api/activity-logs/{self.logs[2].pk}/'
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        etag_sql = ctx.captured_queries[-1]['sql']
+        self.assertNotIn('MAX(', etag_sql)
+        self.assertIn('LIMIT 1', etag_sql)
+
+        self.leads[2].nome = 'Lead renomeado'
+        self.leads[2].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class PipelineColumnPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('create_groups', stdout=StringIO())
+        cls.gestor = create_user('gestor', 'GESTOR')
+        seed_leads(50)
+        Lead.objects.update(status='novo')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.gestor)
+        self.url = reverse('leads:lead_pipeline_column', args=['novo'])
+
+    def test_load_more_continues_after_the_last_card(self):
+        first = self.client.get(self.url)
+        shown = [lead.pk for lead in first.context['leads']]
+        self.assertEqual(len(shown), 20)
+        self.assertTrue(first.context['has_more'])
+
+        # Um card da página já exibida muda de coluna antes do "carregar mais"
+        moved = Lead.objects.get(pk=shown[0])
+        moved.status = 'contato'
+        moved.save()
+
+        second = self.client.get(self.url, {'cursor': first.context['next_cursor']})
+        expected = list(
+            Lead.objects.filter(status='novo').order_by('-data_criacao', '-id').values_list('pk', flat=True)
+        )[19:39]
+        self.assertEqual([lead.pk for lead in second.context['leads']], expected)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'x'}).status_code, 400)
+
+    def test_board_reads_a_limit_per_status(self):
+        Lead.objects.filter(pk__in=Lead.objects.order_by('id').values('pk')[:5]).update(status='convertido')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('leads:lead_pipeline'))
+        kanban = response.context['kanban_data']
+        for status_key in ('novo', 'convertido'):
+            expected = list(
+                Lead.objects.filter(status=status_key).order_by('-data_criacao', '-id').values_list('pk', flat=True)
+            )[:20]
+            self.assertEqual([lead.pk for lead in kanban[status_key]['leads']], expected)
+        self.assertEqual(kanban['contato']['leads'], [])
+        cards_sql = next(q['sql'] for q in ctx.captured_queries if 'UNION ALL' in q['sql'])
+        self.assertNotIn('ROW_NUMBER', cards_sql)
+        self.assertEqual(cards_sql.count('LIMIT'), len(Lead.STATUS_CHOICES))
+
+
+@mock.patch('leads.pagination.estimate_count', return_value=100000)
+class ApproximateCountPaginatorTests(TestCase):
+    """Estimativa do planejador bem acima do total real (25 leads)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_leads(25)
+
+    def setUp(self):
+        cache.clear()
+        self.leads = Lead.objects.order_by('-data_criacao', '-id')
+
+    def paginator(self):
+        return ApproximateCountPaginator(self.leads, 10, exact_threshold=10)
+
+    def test_short_last_page_fixes_the_count(self, _estimate):
+        page = self.paginator().page(3)
+        self.assertEqual(len(page), 5)
+        self.assertFalse(page.has_next())
+        self.assertEqual(cache.get(count_cache_key(self.leads)), {'count': 25, 'approximate': False})
+
+    def test_page_past_the_real_end_falls_back_to_the_last_page(self, _estimate):
+        paginator = self.paginator()
+        page = paginator.get_page(50)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 5)
+        self.assertFalse(paginator.is_approximate)
+        self.assertFalse(page.has_next())
+        # Próximas requisições já partem do total exato
+        self.assertEqual(self.paginator().count, 25)
+
+
+class RankedSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_leads(30)
+        for numero, lead in enumerate(Lead.objects.order_by('id')[:3]):
+            lead.nome = 'Maria ' * (numero + 1) + 'Teste'
+            lead.save()
+
+    def test_sqlite_rank_runs_the_match_once(self):
+        if not fts_available(connection):
+            self.skipTest('Sem tabela FTS5')
+        leads = search_leads(Lead.objects.all(), 'maria', rank=True).order_by('-search_rank', '-id')
+        with CaptureQueriesContext(connection) as queries:
+            resultado = list(leads[:10])
+        self.assertEqual(len(queries), 1)
+        # Um único MATCH no SQL: nada de subconsulta correlacionada por lead
+        self.assertEqual(queries[0]['sql'].count(' MATCH '), 1)
+        self.assertEqual(
+            {lead.pk for lead in resultado}, set(search_leads(Lead.objects.all(), 'maria').values_list('pk', flat=True))
+        )
+        self.assertEqual(resultado[0].nome, 'Maria Maria Maria Teste')
+
+
+class EmailSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_leads(10)
+        cls.lead = Lead.objects.order_by('id').first()
+        cls.lead.email = 'joao.silva@gmail.com'
+        cls.lead.save()
+
+    def assertFinds(self, query, rank=False):
+        leads = search_leads(Lead.objects.all(), query, rank=rank)
+        self.assertIn(self.lead.pk, set(leads.values_list('pk', flat=True)))
+
+    def test_full_email_and_parts(self):
+        for query in ('joao.silva@gmail.com', 'joao.silva', 'silva@gmail', 'JOAO'):
+            with self.subTest(query):
+                self.assertFinds(query)
+                self.assertFinds(query, rank=True)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Caminho do PostgreSQL (índice GIN de to_tsvector)')
+    def test_postgresql_document_has_no_email_lexeme(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_tsvector('simple', search_document)::text FROM leads_lead WHERE id = %s", [self.lead.pk]
+            )
+            vector = cursor.fetchone()[0]
+        self.assertNotIn('@', vector)
+        for term in ('joao', 'silva', 'gmail', 'com'):
+            self.assertIn(f"'{term}'", vector)
+        self.assertFinds('joao.silva@gmail.com', rank=True)
+
+
+class FullScanDetectionTests(TestCase):
+    tables = {'leads_lead'}
+
+    def test_sqlite_index_traversal_counts_unless_a_limit_stops_it(self):
+        plan = '9 5 0 SCAN leads_lead USING INDEX lead_status_criacao_idx'
+        self.assertEqual(full_scans(plan, 'sqlite', self.tables), [plan])
+        self.assertEqual(full_scans(plan, 'sqlite', self.tables, limited=True), [])
+        # Com ordenação depois da leitura, o LIMIT não encurta o percurso
+        sorted_plan = f'{plan}\n40 0 0 USE TEMP B-TREE FOR ORDER BY'
+        self.assertEqual(full_scans(sorted_plan, 'sqlite', self.tables, limited=True), [plan])
+        self.assertEqual(full_scans('3 0 0 SEARCH leads_lead USING INDEX lead_status_idx (status=?)', 'sqlite', self.tables), [])
+
+    def test_postgresql_index_scan_without_condition(self):
+        plan = (
+            'WindowAgg  (cost=0.42..9000.00 rows=200000 width=8)\n'
+            '  ->  Index Scan Backward using lead_status_criacao_idx on leads_lead  (cost=0.42..8000.00 rows=200000 width=8)'
+        )
+        self.assertEqual(len(full_scans(plan, 'postgresql', self.tables)), 1)
+        searched = (
+            'Limit  (cost=0.42..1.00 rows=20 width=8)\n'
+            '  ->  Index Scan Backward using lead_status_criacao_idx on leads_lead  (cost=0.42..500.00 rows=40000 width=8)\n'
+            "        Index Cond: ((status)::text = 'novo'::text)"
+        )
+        self.assertEqual(full_scans(searched, 'postgresql', self.tables), [])
+
+    @skipUnless(connection.vendor == 'sqlite', 'Plano do SQLite')
+    def test_pipeline_window_query_is_flagged(self):
+        seed_leads(20)
+        tables = set(connection.introspection.table_names())
+        window = Lead.objects.annotate(
+            posicao=Window(RowNumber(), partition_by=[F('status')], order_by=[F('data_criacao').desc(), F('id').desc()])
+        ).filter(posicao__lte=20)
+        self.assertTrue(full_scans(explain(window), 'sqlite', tables))
+
+        cards = Lead.objects.filter(id__in=first_cards_per_status(Lead.objects.all()))
+        self.assertEqual(full_scans(explain(cards), 'sqlite', tables), [])
+
+
+class PdfExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('create_groups', stdout=StringIO())
+        cls.gestor = create_user('gestor', 'GESTOR')
+        seed_leads(30)
+
+    def test_pdf_is_streamed_from_a_temporary_file(self):
+        self.client.force_login(self.gestor)
+        response = self.client.get(reverse('leads:export_pdf'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('filename="leads.pdf"', response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+
+class LeadStatsSignalTests(TestCase):
+    """LeadStats acompanha gravações fora das views (admin, shell) e a exclusão de usuários."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('create_groups', stdout=StringIO())
+        cls.gestor = create_user('gestor', 'GESTOR')
+        seed_leads(20)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertNoDrift(self):
+        self.assertEqual(lead_stats_drift(), [])
+
+    def test_orm_create_update_and_delete(self):
+        atendente = User.objects.filter(groups__name='ATENDENTE').first()
+        lead = Lead.objects.create(nome='Lead Admin', telefone='11999990000', atendente=atendente, valor_curso=1500)
+        self.assertNoDrift()
+
+        lead = Lead.objects.get(pk=lead.pk)
+        lead.status, lead.atendente, lead.valor_curso = 'convertido', None, 2000
+        lead.save()
+        self.assertNoDrift()
+
+        # Campos do balde adiados: o balde antigo é lido do banco
+        lead = Lead.objects.only('nome').get(pk=lead.pk)
+        lead.status = 'perdido'
+        lead.save()
+        self.assertNoDrift()
+
+        Lead.objects.filter(pk=lead.pk).delete()
+        self.assertNoDrift()
+
+    def test_view_changes_are_counted_once(self):
+        self.client.force_login(self.gestor)
+        lead = Lead.objects.exclude(status='perdido').first()
+        response = self.client.post(
+            reverse('leads:update_lead_status', args=[lead.pk]), {'status': 'perdido'}
+        )
+        self.assertTrue(response.json()['success'])
+        self.client.post(reverse('leads:lead_delete', args=[lead.pk]))
+        self.assertFalse(Lead.objects.filter(pk=lead.pk).exists())
+        self.assertNoDrift()
+
+    def test_deleting_an_atendente_moves_their_buckets(self):
+        atendente = User.objects.filter(groups__name='ATENDENTE', lead__isnull=False).first()
+        self.assertTrue(LeadStats.objects.filter(atendente_id=atendente.pk).exists())
+        atendente_id = atendente.pk
+        atendente.delete()
+        self.assertFalse(LeadStats.objects.filter(atendente_id=atendente_id).exists())
+        self.assertNoDrift()
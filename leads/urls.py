@@ -6,6 +6,8 @@ app_name = 'leads'
 urlpatterns = [
     path('', views.lead_list, name='lead_list'),
     path('pipeline/', views.lead_pipeline, name='lead_pipeline'),
+    path('pipeline/bulk/', views.pipeline_bulk_update, name='pipeline_bulk_update'),
+    path('pipeline/<str:status>/cards/', views.lead_pipeline_column, name='lead_pipeline_column'),
     path('activity-logs/', views.activity_logs, name='activity_logs'),
     path('<int:pk>/update-status/', views.update_lead_status, name='update_lead_status'),
     path('create/', views.lead_create, name='lead_create'),
@@ -14,4 +16,8 @@ urlpatterns = [
     path('<int:pk>/delete/', views.lead_delete, name='lead_delete'),
     path('export/xlsx/', views.export_leads_xlsx, name='export_xlsx'),
     path('export/pdf/', views.export_leads_pdf, name='export_pdf'),
+    path('export/csv/', views.export_leads_csv, name='export_csv'),
+    path('export/jobs/<str:formato>/', views.export_job_create, name='export_job_create'),
+    path('export/jobs/<int:pk>/status/', views.export_job_status, name='export_job_status'),
+    path('export/jobs/<int:pk>/download/', views.export_job_download, name='export_job_download'),
 ]
\ No newline at end of file
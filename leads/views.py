@@ -3,25 +3,33 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.core.paginator import Paginator
+from django.db import connections, transaction
 from django.db.models import Q, Count
-from django.http import HttpResponse, JsonResponse
-import csv
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from io import BytesIO
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from io import BytesIO
-from .models import Lead, ActivityLog
+from django.db.models.expressions import RawSQL
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import condition
+import os
+from .models import Lead, ActivityLog, ActivityLogArchive, ExportJob
+from .filters import (
+    ACTIVITY_LOG_FILTER_PARAMS, LEAD_FILTER_PARAMS, filter_activity_logs, filter_leads, filter_values,
+)
+from .audit import log_activity
+from .bulk import KEEP, bulk_update_leads
+from .exports import (
+    EXPORT_CONTENT_TYPES, EXPORT_WRITERS, XLSX_CONTENT_TYPE, gzip_chunks, iter_leads_csv, leads_pdf_tempfile,
+    leads_xlsx_tempfile, submit_export_job,
+)
+from .conditional import has_pending_messages, lead_etag
 from .forms import LeadForm
+from .pagination import ApproximateCountPaginator, InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor
+from .roles import scoped_activity_logs, scoped_leads
+from .search import search_terms
+from .stats import get_dashboard_stats, lead_status_counts
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 import json
+from urllib.parse import urlencode
 
 
 # Autenticação
@@ -64,123 +72,133 @@ def register_view(request):
 
 @login_required
 def dashboard(request):
-    # Cards existentes
-    total_leads = Lead.objects.count()
-    novos = Lead.objects.filter(status="novo").count()
-    progresso = Lead.objects.filter(status="progresso").count()
-    convertidos = Lead.objects.filter(status="convertido").count()
-
-    # Novos cards
-    from django.db.models import Avg, Sum
-    ticket_medio = Lead.objects.filter(valor_curso__isnull=False).aggregate(avg=Avg('valor_curso'))['avg'] or 0
-    faturamento_total = Lead.objects.filter(status="convertido", valor_curso__isnull=False).aggregate(total=Sum('valor_curso'))['total'] or 0
-
-    # Últimos leads
-    ultimos_leads = Lead.objects.order_by("-data_criacao")[:5]
-
-    # Dados para gráfico de status (pipeline donut)
-    status_counts = (
-        Lead.objects.values("status").annotate(count=Count("status")).order_by("status")
-    )
-    status_labels = [dict(Lead.STATUS_CHOICES)[s["status"]] for s in status_counts]
-    status_data = [s["count"] for s in status_counts]
+    stats = get_dashboard_stats(request.crm_role)
+    return render(request, "dashboard.html", {"stats": stats})
 
-    # Dados para gráfico de origem
-    origem_counts = (
-        Lead.objects.values("origem").annotate(count=Count("origem")).order_by("-count")
-    )
-    origem_labels = [dict(Lead.ORIGEM_CHOICES)[o["origem"]] for o in origem_counts]
-    origem_data = [o["count"] for o in origem_counts]
-
-    # Ranking de atendentes
-    atendente_ranking = (
-        Lead.objects.filter(atendente__isnull=False)
-        .values("atendente__username", "atendente__first_name", "atendente__last_name")
-        .annotate(convertidos=Count("id", filter=Q(status="convertido")))
-        .order_by("-convertidos")[:5]
-    )
 
-    context = {
-        "total_leads": total_leads,
-        "novos": novos,
-        "progresso": progresso,
-        "convertidos": convertidos,
-        "ticket_medio": ticket_medio,
-        "faturamento_total": faturamento_total,
-        "ultimos_leads": ultimos_leads,
-        "status_labels": json.dumps(status_labels),
-        "status_data": json.dumps(status_data),
-        "origem_labels": json.dumps(origem_labels),
-        "origem_data": json.dumps(origem_data),
-        "atendente_ranking": atendente_ranking,
-    }
-    return render(request, "dashboard.html", context)
+# Quantidade de cards renderizados por coluna do Kanban a cada carregamento
+PIPELINE_PAGE_SIZE = 20
+
+# Ordem dos cards em cada coluna (keyset sobre lead_status_criacao_idx)
+PIPELINE_ORDERING = ('-data_criacao', '-id')
+
+
+def first_cards_per_status(leads):
+    """UNION ALL de um ``LIMIT`` por status, cada um sobre ``lead_status_criacao_idx``.
+
+    Um ROW_NUMBER() por status leria e ordenaria a tabela inteira a cada
+    carregamento; aqui cada coluna lê só os seus primeiros cards.
+    """
+    connection = connections[leads.db]
+    parts, params = [], []
+    for number, (status_key, _label) in enumerate(Lead.STATUS_CHOICES):
+        column = leads.filter(status=status_key).order_by(*PIPELINE_ORDERING).values('id')[:PIPELINE_PAGE_SIZE]
+        sql, column_params = column.query.get_compiler(connection=connection).as_sql()
+        parts.append(f'SELECT id FROM ({sql}) AS coluna_{number}')
+        params.extend(column_params)
+    return RawSQL(' UNION ALL '.join(parts), params)
 
 
 @login_required
 def lead_pipeline(request):
     # Filtrar por atendente se for ATENDENTE
-    leads = Lead.objects.all()
-    if request.user.groups.filter(name='ATENDENTE').exists():
-        leads = leads.filter(atendente=request.user)
+    leads = scoped_leads(request)
+    role = request.crm_role
+
+    # Contagens por coluna vêm de LeadStats
+    counts = lead_status_counts(role.user_id if role.is_atendente else None)
+
+    # Primeiros cards de todas as colunas em uma única consulta
+    cards = (
+        leads.select_related('atendente')
+        .filter(id__in=first_cards_per_status(leads))
+        .order_by('status', *PIPELINE_ORDERING)
+    )
 
     # Organizar leads por status para o Kanban
     kanban_data = {}
     for status_key, status_label in Lead.STATUS_CHOICES:
         kanban_data[status_key] = {
             'label': status_label,
-            'leads': leads.filter(status=status_key).order_by('-data_criacao')
+            'count': counts.get(status_key, 0),
+            'leads': [],
         }
+    for lead in cards:
+        kanban_data[lead.status]['leads'].append(lead)
+    for column in kanban_data.values():
+        last = column['leads'][-1] if column['leads'] else None
+        column['has_more'] = last is not None and column['count'] > len(column['leads'])
+        # "Carregar mais" continua a partir do último card, como o KeysetPaginator
+        column['next_cursor'] = (
+            encode_cursor([last.data_criacao, last.id], 'next', {}) if column['has_more'] else None
+        )
 
     context = {
         'kanban_data': kanban_data,
+        'status_choices': Lead.STATUS_CHOICES,
+        # Reatribuição em lote só para quem pode atribuir a outras pessoas
+        'atendentes': User.objects.filter(is_active=True).order_by('first_name', 'username') if role.is_manager else None,
     }
     return render(request, "leads/pipeline.html", context)
 
 
 @login_required
-def activity_logs(request):
-    # Filtrar logs por permissões
-    logs = ActivityLog.objects.select_related('lead', 'user')
+def lead_pipeline_column(request, status):
+    # Próxima página de cards de uma coluna (HTMX "carregar mais")
+    if status not in dict(Lead.STATUS_CHOICES):
+        return HttpResponse(status=404)
+
+    leads = scoped_leads(request).filter(status=status).select_related('atendente')
 
-    if request.user.groups.filter(name='ATENDENTE').exists():
-        # ATENDENTE vê apenas logs de leads que são dele
-        logs = logs.filter(lead__atendente=request.user)
+    # Cursor no último card exibido: cards movidos entre colunas não deslocam a página
+    paginator = KeysetPaginator(leads, PIPELINE_PAGE_SIZE, ordering=PIPELINE_ORDERING)
+    try:
+        page = paginator.page(request.GET.get('cursor', ''))
+    except InvalidCursor:
+        return HttpResponse(status=400)
 
-    # Filtros
-    lead_filter = request.GET.get('lead', '')
-    user_filter = request.GET.get('user', '')
-    action_filter = request.GET.get('action', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
+    context = {
+        'status_key': status,
+        'leads': page.object_list,
+        'has_more': page.has_next(),
+        'next_cursor': page.next_cursor,
+    }
+    return render(request, "includes/_pipeline_cards.html", context)
 
-    if lead_filter:
-        logs = logs.filter(lead__nome__icontains=lead_filter)
 
-    if user_filter:
-        logs = logs.filter(user__username__icontains=user_filter)
+@login_required
+def activity_logs(request):
+    # Filtros vêm do cursor ao navegar entre páginas, senão da querystring
+    cursor = request.GET.get('cursor', '')
+    params = request.GET
+    if cursor:
+        try:
+            _position, _direction, params = decode_cursor(cursor)
+        except InvalidCursor:
+            cursor = ''
+    filters = filter_values(params, ACTIVITY_LOG_FILTER_PARAMS)
 
-    if action_filter:
-        logs = logs.filter(action=action_filter)
+    # Logs antigos ficam na tabela de arquivo e só são consultados sob demanda
+    model = ActivityLogArchive if filters['arquivo'] else ActivityLog
 
-    if date_from:
-        logs = logs.filter(timestamp__date__gte=date_from)
+    # Filtrar logs por permissões (ATENDENTE vê apenas logs de leads que são dele)
+    logs = scoped_activity_logs(request, model.objects.select_related('lead', 'user'))
 
-    if date_to:
-        logs = logs.filter(timestamp__date__lte=date_to)
+    logs = filter_activity_logs(logs, filters)
 
-    # Paginação
-    paginator = Paginator(logs, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginação por cursor sobre (timestamp, id)
+    paginator = KeysetPaginator(logs, 20, ordering=('-timestamp', '-id'))
+    page_obj = paginator.page(cursor, filters=filters)
 
     context = {
         'page_obj': page_obj,
-        'lead_filter': lead_filter,
-        'user_filter': user_filter,
-        'action_filter': action_filter,
-        'date_from': date_from,
-        'date_to': date_to,
+        'lead_filter': filters['lead'],
+        'user_filter': filters['user'],
+        'action_filter': filters['action'],
+        'date_from': filters['date_from'],
+        'date_to': filters['date_to'],
+        'arquivo': filters['arquivo'],
+        'users': User.objects.order_by('username').only('id', 'username', 'first_name', 'last_name'),
         'action_choices': ActivityLog.ACTION_CHOICES,
     }
     return render(request, "leads/activity_logs.html", context)
@@ -202,22 +220,23 @@ def update_lead_status(request, pk):
             old_status = lead.status
 
             # Verificar permissões
-            if request.user.groups.filter(name='ATENDENTE').exists() and lead.atendente != request.user:
+            if not request.crm_role.can_access(lead):
                 return JsonResponse({'success': False, 'error': 'Permissão negada'})
 
             if new_status in dict(Lead.STATUS_CHOICES) and old_status != new_status:
-                lead.status = new_status
-                lead.save()
-
-                # Criar log de atividade
-                ActivityLog.objects.create(
-                    lead=lead,
-                    user=request.user,
-                    action='status_changed',
-                    old_value=old_status,
-                    new_value=new_status,
-                    description=f'Status alterado via pipeline de "{dict(Lead.STATUS_CHOICES)[old_status]}" para "{dict(Lead.STATUS_CHOICES)[new_status]}"'
-                )
+                with transaction.atomic():
+                    lead.status = new_status
+                    lead.save()
+
+                    # Criar log de atividade
+                    log_activity(
+                        lead=lead,
+                        user=request.user,
+                        action='status_changed',
+                        old_value=old_status,
+                        new_value=new_status,
+                        description=f'Status alterado via pipeline de "{dict(Lead.STATUS_CHOICES)[old_status]}" para "{dict(Lead.STATUS_CHOICES)[new_status]}"'
+                    )
 
                 return JsonResponse({'success': True})
             else:
@@ -229,94 +248,109 @@ def update_lead_status(request, pk):
     return JsonResponse({'success': False, 'error': 'Método não permitido'})
 
 
-@login_required
-def lead_list(request):
-    query = request.GET.get("q", "")
-    status_filter = request.GET.get("status", "")
-    origem_filter = request.GET.get("origem", "")
-    atendente_filter = request.GET.get("atendente", "")
-    prioridade_filter = request.GET.get("prioridade", "")
-    prob_min = request.GET.get("prob_min", "")
-    prob_max = request.GET.get("prob_max", "")
-    data_inicial = request.GET.get("data_inicial", "")
-    data_final = request.GET.get("data_final", "")
-    order_by = request.GET.get("order", "-data_criacao")
-
-    leads = Lead.objects.all()
-
-    # Filtrar por atendente se for ATENDENTE
-    if request.user.groups.filter(name='ATENDENTE').exists():
-        leads = leads.filter(atendente=request.user)
-
-    if query:
-        leads = leads.filter(Q(nome__icontains=query) | Q(email__icontains=query) | Q(curso_interesse__icontains=query))
-
-    if status_filter:
-        leads = leads.filter(status=status_filter)
-
-    if origem_filter:
-        leads = leads.filter(origem=origem_filter)
-
-    if atendente_filter:
-        leads = leads.filter(atendente_id=atendente_filter)
-
-    if prioridade_filter:
-        leads = leads.filter(prioridade=prioridade_filter)
+# Limite de cards por operação em lote no pipeline
+PIPELINE_BULK_MAX_IDS = 500
 
-    if prob_min:
-        leads = leads.filter(probabilidade_fechamento__gte=prob_min)
 
-    if prob_max:
-        leads = leads.filter(probabilidade_fechamento__lte=prob_max)
-
-    if data_inicial:
-        leads = leads.filter(data_criacao__date__gte=data_inicial)
-
-    if data_final:
-        leads = leads.filter(data_criacao__date__lte=data_final)
-
-    leads = leads.order_by(order_by)
+@login_required
+def pipeline_bulk_update(request):
+    """Muda status e/ou atendente de vários cards selecionados no pipeline."""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método não permitido'})
+    try:
+        data = json.loads(request.body)
+        ids = [int(pk) for pk in data.get('ids', [])]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Dados inválidos'}, status=400)
+
+    new_status = data.get('status') or None
+    if not ids or len(ids) > PIPELINE_BULK_MAX_IDS:
+        return JsonResponse({'success': False, 'error': f'Selecione de 1 a {PIPELINE_BULK_MAX_IDS} leads'}, status=400)
+    if new_status is not None and new_status not in dict(Lead.STATUS_CHOICES):
+        return JsonResponse({'success': False, 'error': 'Status inválido'}, status=400)
+
+    atendente_id = KEEP
+    if 'atendente' in data:
+        role = request.crm_role
+        try:
+            atendente_id = int(data['atendente']) if data['atendente'] not in (None, '') else None
+        except (ValueError, TypeError):
+            return JsonResponse({'success': False, 'error': 'Atendente inválido'}, status=400)
+        # Como no LeadForm: só ADMIN/GESTOR atribuem leads a outras pessoas
+        if not role.is_manager and atendente_id != role.user_id:
+            return JsonResponse({'success': False, 'error': 'Permissão negada'}, status=403)
+        if atendente_id is not None and not User.objects.filter(pk=atendente_id, is_active=True).exists():
+            return JsonResponse({'success': False, 'error': 'Atendente inválido'}, status=400)
+
+    if new_status is None and atendente_id is KEEP:
+        return JsonResponse({'success': False, 'error': 'Informe o novo status ou atendente'}, status=400)
+
+    # Leads fora do escopo do usuário simplesmente não entram no UPDATE
+    updated = bulk_update_leads(
+        scoped_leads(request).filter(pk__in=ids), request.user, status=new_status, atendente_id=atendente_id
+    )
+    return JsonResponse({'success': True, 'updated': updated})
 
-    paginator = Paginator(leads, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
 
-    context = {
-        "page_obj": page_obj,
-        "query": query,
-        "status_filter": status_filter,
-        "origem_filter": origem_filter,
-        "atendente_filter": atendente_filter,
-        "prioridade_filter": prioridade_filter,
-        "prob_min": prob_min,
-        "prob_max": prob_max,
-        "data_inicial": data_inicial,
-        "data_final": data_final,
-        "order_by": order_by,
-        "users": User.objects.all(),
-        "status_choices": Lead.STATUS_CHOICES,
-        "origem_choices": Lead.ORIGEM_CHOICES,
-        "prioridade_choices": Lead.PRIORIDADE_CHOICES,
-    }
-    return render(request, "leads/list.html", context)
+# Ordenações da listagem atendidas por paginação keyset (cursor)
+KEYSET_ORDERINGS = {
+    '-data_criacao': ('-data_criacao', '-id'),
+    'data_criacao': ('data_criacao', 'id'),
+}
 
-    leads = leads.order_by(order_by)
 
-    paginator = Paginator(leads, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+@login_required
+def lead_list(request):
+    # Filtros vêm do cursor ao navegar entre páginas, senão da querystring
+    cursor = request.GET.get("cursor", "")
+    params = request.GET
+    if cursor:
+        try:
+            _position, _direction, params = decode_cursor(cursor)
+        except InvalidCursor:
+            cursor = ""
+    filters = filter_values(params, LEAD_FILTER_PARAMS)
+    # Com busca, o padrão é ordenar por relevância (só se houver termos pesquisáveis)
+    has_terms = bool(search_terms(filters["q"]))
+    order_by = params.get("order") or ("relevancia" if has_terms else "-data_criacao")
+    if order_by == "relevancia" and not has_terms:
+        order_by = "-data_criacao"
+
+    # Filtrar por atendente se for ATENDENTE (atendente no mesmo SELECT: a tabela exibe o nome)
+    leads = scoped_leads(request, Lead.objects.select_related("atendente"))
+
+    leads = filter_leads(leads, filters, rank=order_by == "relevancia")
+
+    active_filters = {name: value for name, value in filters.items() if value}
+    export_filters = dict(active_filters)
+    active_filters["order"] = order_by
+
+    cursor_mode = order_by in KEYSET_ORDERINGS
+    if cursor_mode:
+        paginator = KeysetPaginator(leads, 10, ordering=KEYSET_ORDERINGS[order_by])
+        page_obj = paginator.page(cursor, filters=active_filters)
+        page_range = None
+    else:
+        ordering = ["-search_rank", "-data_criacao"] if order_by == "relevancia" else [order_by]
+        paginator = ApproximateCountPaginator(leads.order_by(*ordering), 10)
+        page_obj = paginator.get_page(request.GET.get("page"))
+        page_range = paginator.get_elided_page_range(page_obj.number, on_each_side=2, on_ends=1)
 
     context = {
         "page_obj": page_obj,
-        "query": query,
-        "status_filter": status_filter,
-        "origem_filter": origem_filter,
-        "atendente_filter": atendente_filter,
-        "prioridade_filter": prioridade_filter,
-        "prob_min": prob_min,
-        "prob_max": prob_max,
-        "data_inicial": data_inicial,
-        "data_final": data_final,
+        "cursor_mode": cursor_mode,
+        "page_range": page_range,
+        "filter_querystring": urlencode(active_filters),
+        "export_filters": export_filters,
+        "query": filters["q"],
+        "status_filter": filters["status"],
+        "origem_filter": filters["origem"],
+        "atendente_filter": filters["atendente"],
+        "prioridade_filter": filters["prioridade"],
+        "prob_min": filters["prob_min"],
+        "prob_max": filters["prob_max"],
+        "data_inicial": filters["data_inicial"],
+        "data_final": filters["data_final"],
         "order_by": order_by,
         "users": User.objects.all(),
         "status_choices": Lead.STATUS_CHOICES,
@@ -328,333 +362,101 @@ def lead_list(request):
 
 @login_required
 def export_leads_xlsx(request):
-    # Aplicar os mesmos filtros da listagem
-    leads = Lead.objects.all()
-
-    # Filtrar por atendente se for ATENDENTE
-    if request.user.groups.filter(name='ATENDENTE').exists():
-        leads = leads.filter(atendente=request.user)
+    # Aplicar o mesmo escopo da listagem (ATENDENTE vê apenas os próprios leads)
+    leads = scoped_leads(request)
 
     # Aplicar filtros da requisição
-    query = request.GET.get("q", "")
-    status_filter = request.GET.get("status", "")
-    origem_filter = request.GET.get("origem", "")
-    atendente_filter = request.GET.get("atendente", "")
-    prioridade_filter = request.GET.get("prioridade", "")
-    prob_min = request.GET.get("prob_min", "")
-    prob_max = request.GET.get("prob_max", "")
-    data_inicial = request.GET.get("data_inicial", "")
-    data_final = request.GET.get("data_final", "")
-
-    if query:
-        leads = leads.filter(Q(nome__icontains=query) | Q(email__icontains=query) | Q(curso_interesse__icontains=query))
-
-    if status_filter:
-        leads = leads.filter(status=status_filter)
-
-    if origem_filter:
-        leads = leads.filter(origem=origem_filter)
-
-    if atendente_filter:
-        leads = leads.filter(atendente_id=atendente_filter)
-
-    if prioridade_filter:
-        leads = leads.filter(prioridade=prioridade_filter)
-
-    if prob_min:
-        leads = leads.filter(probabilidade_fechamento__gte=prob_min)
+    leads = filter_leads(leads, request.GET)
+
+    # Planilha gerada em disco e enviada em blocos
+    return FileResponse(
+        leads_xlsx_tempfile(leads),
+        as_attachment=True,
+        filename='leads.xlsx',
+        content_type=XLSX_CONTENT_TYPE,
+    )
 
-    if prob_max:
-        leads = leads.filter(probabilidade_fechamento__lte=prob_max)
 
-    if data_inicial:
-        leads = leads.filter(data_criacao__date__gte=data_inicial)
+@login_required
+def export_leads_csv(request):
+    # Mesmos filtros e escopo da exportação Excel
+    leads = scoped_leads(request)
 
-    if data_final:
-        leads = leads.filter(data_criacao__date__lte=data_final)
+    leads = filter_leads(leads, request.GET)
 
-    # Criar workbook Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Leads"
+    # Linhas geradas sob demanda; ?gzip=1 entrega o arquivo comprimido
+    chunks = iter_leads_csv(leads)
+    if request.GET.get('gzip') in ('1', 'true'):
+        response = StreamingHttpResponse(gzip_chunks(chunks), content_type='application/gzip')
+        response['Content-Disposition'] = 'attachment; filename="leads.csv.gz"'
+    else:
+        response = StreamingHttpResponse(chunks, content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="leads.csv"'
+    return response
 
-    # Estilos
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
 
-    data_font = Font(size=10)
-    data_alignment = Alignment(horizontal="left", vertical="center")
+@login_required
+def export_leads_pdf(request):
+    # Aplicar o mesmo escopo da listagem (ATENDENTE vê apenas os próprios leads)
+    leads = scoped_leads(request)
 
-    border = Border(
-        left=Side(style='thin', color='000000'),
-        right=Side(style='thin', color='000000'),
-        top=Side(style='thin', color='000000'),
-        bottom=Side(style='thin', color='000000')
+    # Aplicar filtros da requisição
+    leads = filter_leads(leads, request.GET)
+
+    # Relatório gerado em disco e enviado em blocos, como a planilha
+    return FileResponse(
+        leads_pdf_tempfile(leads, request.GET),
+        as_attachment=True,
+        filename='leads.pdf',
+        content_type='application/pdf',
     )
 
-    # Cabeçalhos
-    headers = [
-        'Nome', 'Telefone', 'Email', 'Curso', 'Origem', 'Prioridade',
-        'Probabilidade', 'Valor Curso', 'Atendente', 'Status', 'Data Criação', 'Observação Interna'
-    ]
-
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = border
-
-    # Dados
-    for row_num, lead in enumerate(leads, 2):
-        data = [
-            lead.nome,
-            lead.telefone,
-            lead.email or '',
-            lead.curso_interesse,
-            lead.get_origem_display(),
-            lead.get_prioridade_display(),
-            f"{lead.probabilidade_fechamento}%",
-            lead.valor_curso if lead.valor_curso else '',
-            lead.atendente.get_full_name() if lead.atendente else '',
-            lead.get_status_display(),
-            lead.data_criacao.strftime('%d/%m/%Y %H:%M'),
-            lead.observacao_interna or ''
-        ]
-
-        for col_num, value in enumerate(data, 1):
-            cell = ws.cell(row=row_num, column=col_num, value=value)
-            cell.font = data_font
-            cell.alignment = data_alignment
-            cell.border = border
-
-    # Ajustar larguras das colunas
-    column_widths = {
-        'A': 25,  # Nome
-        'B': 15,  # Telefone
-        'C': 25,  # Email
-        'D': 20,  # Curso
-        'E': 12,  # Origem
-        'F': 12,  # Prioridade
-        'G': 12,  # Probabilidade
-        'H': 15,  # Valor Curso
-        'I': 20,  # Atendente
-        'J': 12,  # Status
-        'K': 18,  # Data Criação
-        'L': 30,  # Observação Interna
-    }
-
-    for col_letter, width in column_widths.items():
-        ws.column_dimensions[col_letter].width = width
 
-    # Congelar a primeira linha
-    ws.freeze_panes = 'A2'
+@login_required
+def export_job_create(request, formato):
+    """Enfileira a exportação com os filtros atuais e redireciona para o acompanhamento."""
+    if request.method != 'POST' or formato not in EXPORT_WRITERS:
+        return redirect('leads:lead_list')
 
-    # Salvar em buffer
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+    job, created = submit_export_job(request.user, request.crm_role.scope, formato, request.POST)
+    if created:
+        messages.success(request, 'Exportação enviada para a fila. O arquivo ficará disponível nesta página.')
+    else:
+        messages.info(request, 'Uma exportação idêntica já está em andamento; acompanhe-a abaixo.')
+    return redirect('leads:export_job_status', pk=job.pk)
 
-    # Criar resposta HTTP
-    response = HttpResponse(
-        buffer.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="leads.xlsx"'
 
-    return response
+def _visible_export_job(request, pk):
+    # Jobs são compartilhados entre usuários do mesmo escopo (pedidos deduplicados)
+    return get_object_or_404(ExportJob, pk=pk, scope=request.crm_role.scope)
 
 
 @login_required
-def export_leads_pdf(request):
-    # Função auxiliar para criar parágrafos que se ajustam às células
-    def create_cell_paragraph(text, max_length=None, font_size=8):
-        if not text or text == '-':
-            return text or '-'
-
-        # Limitar comprimento se especificado
-        if max_length and len(text) > max_length:
-            text = text[:max_length] + '...'
-
-        # Criar estilo para célula
-        cell_style = ParagraphStyle(
-            'CellStyle',
-            fontSize=font_size,
-            leading=font_size + 2,  # Espaçamento entre linhas
-            alignment=0,  # Esquerda
-        )
-
-        return Paragraph(text, cell_style)
-
-    # Aplicar os mesmos filtros da listagem
-    leads = Lead.objects.all()
+def export_job_status(request, pk):
+    job = _visible_export_job(request, pk)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'id': job.pk,
+            'status': job.status,
+            'status_display': job.get_status_display(),
+            'formato': job.formato,
+            'error': job.error,
+            'download_url': reverse('leads:export_job_download', args=[job.pk]) if job.status == 'done' else None,
+        })
+    return render(request, 'leads/export_job.html', {'job': job})
 
-    # Filtrar por atendente se for ATENDENTE
-    if request.user.groups.filter(name='ATENDENTE').exists():
-        leads = leads.filter(atendente=request.user)
-
-    # Aplicar filtros da requisição (mesmo código do CSV)
-    query = request.GET.get("q", "")
-    status_filter = request.GET.get("status", "")
-    origem_filter = request.GET.get("origem", "")
-    atendente_filter = request.GET.get("atendente", "")
-    prioridade_filter = request.GET.get("prioridade", "")
-    prob_min = request.GET.get("prob_min", "")
-    prob_max = request.GET.get("prob_max", "")
-    data_inicial = request.GET.get("data_inicial", "")
-    data_final = request.GET.get("data_final", "")
-
-    if query:
-        leads = leads.filter(Q(nome__icontains=query) | Q(email__icontains=query) | Q(curso_interesse__icontains=query))
-
-    if status_filter:
-        leads = leads.filter(status=status_filter)
-
-    if origem_filter:
-        leads = leads.filter(origem=origem_filter)
-
-    if atendente_filter:
-        leads = leads.filter(atendente_id=atendente_filter)
-
-    if prioridade_filter:
-        leads = leads.filter(prioridade=prioridade_filter)
-
-    if prob_min:
-        leads = leads.filter(probabilidade_fechamento__gte=prob_min)
-
-    if prob_max:
-        leads = leads.filter(probabilidade_fechamento__lte=prob_max)
-
-    if data_inicial:
-        leads = leads.filter(data_criacao__date__gte=data_inicial)
-
-    if data_final:
-        leads = leads.filter(data_criacao__date__lte=data_final)
-
-    # Criar PDF com orientação paisagem para mais espaço
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4))
-    elements = []
-
-    # Estilos
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Title'],
-        fontSize=16,
-        spaceAfter=30,
-        alignment=1  # Centralizado
-    )
 
-    # Título
-    title = Paragraph("Relatório de Leads", title_style)
-    elements.append(title)
-
-    # Informações do filtro
-    filter_info = []
-    if query:
-        filter_info.append(f"Busca: {query}")
-    if status_filter:
-        filter_info.append(f"Status: {dict(Lead.STATUS_CHOICES).get(status_filter, status_filter)}")
-    if origem_filter:
-        filter_info.append(f"Origem: {dict(Lead.ORIGEM_CHOICES).get(origem_filter, origem_filter)}")
-    if atendente_filter:
-        try:
-            user = User.objects.get(id=atendente_filter)
-            filter_info.append(f"Atendente: {user.get_full_name() or user.username}")
-        except:
-            filter_info.append(f"Atendente ID: {atendente_filter}")
-
-    if filter_info:
-        filter_text = "Filtros aplicados: " + ", ".join(filter_info)
-        filter_paragraph = Paragraph(filter_text, styles['Normal'])
-        elements.append(filter_paragraph)
-        elements.append(Spacer(1, 12))
-
-    # Estilo para cabeçalhos da tabela
-    header_style = ParagraphStyle(
-        'HeaderStyle',
-        fontSize=9,
-        fontName='Helvetica-Bold',
-        alignment=1,  # Centralizado
-        textColor=colors.whitesmoke
-    )
-
-    # Dados da tabela com parágrafos para quebra automática de linhas
-    data = [
-        [
-            Paragraph('Nome', header_style),
-            Paragraph('Telefone', header_style),
-            Paragraph('Email', header_style),
-            Paragraph('Curso', header_style),
-            Paragraph('Origem', header_style),
-            Paragraph('Prioridade', header_style),
-            Paragraph('Prob.', header_style),
-            Paragraph('Valor', header_style),
-            Paragraph('Atendente', header_style),
-            Paragraph('Status', header_style),
-            Paragraph('Data', header_style)
-        ]
-    ]
-
-    for lead in leads:
-        # Usar parágrafos para permitir quebra automática de linhas
-        data.append([
-            create_cell_paragraph(lead.nome, max_length=30),
-            create_cell_paragraph(lead.telefone),
-            create_cell_paragraph(lead.email or '-', max_length=25),
-            create_cell_paragraph(lead.curso_interesse or '-', max_length=25),
-            create_cell_paragraph(lead.get_origem_display()),
-            create_cell_paragraph(lead.get_prioridade_display()),
-            create_cell_paragraph(f"{lead.probabilidade_fechamento}%"),
-            create_cell_paragraph(f"R$ {lead.valor_curso:,}" if lead.valor_curso else '-'),
-            create_cell_paragraph(lead.atendente.get_full_name() if lead.atendente else '-', max_length=20),
-            create_cell_paragraph(lead.get_status_display()),
-            create_cell_paragraph(lead.data_criacao.strftime('%d/%m/%Y'))
-        ])
-
-    # Criar tabela com larguras de coluna ajustadas
-    col_widths = [1.4*inch, 0.9*inch, 1.4*inch, 1.2*inch, 0.8*inch, 0.8*inch, 0.6*inch, 0.9*inch, 1.2*inch, 0.8*inch, 0.8*inch]
-    table = Table(data, colWidths=col_widths)
-
-    # Estilo da tabela melhorado
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-        ('TOPPADDING', (0, 0), (-1, 0), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('VALIGN', (0, 1), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 1), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 2),
-    ]))
-
-    elements.append(table)
-
-    # Adicionar total de leads
-    total_style = ParagraphStyle(
-        'TotalStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceBefore=20,
-        alignment=2  # Direita
+@login_required
+def export_job_download(request, pk):
+    job = _visible_export_job(request, pk)
+    if job.status != 'done' or not os.path.exists(job.file_path):
+        raise Http404('Arquivo de exportação indisponível')
+    return FileResponse(
+        open(job.file_path, 'rb'),
+        as_attachment=True,
+        filename=f'leads.{job.formato}',
+        content_type=EXPORT_CONTENT_TYPES[job.formato],
     )
-    total_text = f"Total de leads: {leads.count()}"
-    total_paragraph = Paragraph(total_text, total_style)
-    elements.append(total_paragraph)
-
-    doc.build(elements)
-
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="leads.pdf"'
-
-    return response
 
 
 @login_required
@@ -662,14 +464,15 @@ def lead_create(request):
     if request.method == "POST":
         form = LeadForm(request.POST, user=request.user)
         if form.is_valid():
-            lead = form.save()
-            # Criar log de atividade
-            ActivityLog.objects.create(
-                lead=lead,
-                user=request.user,
-                action='created',
-                description=f'Lead criado por {request.user.get_full_name() or request.user.username}'
-            )
+            with transaction.atomic():
+                lead = form.save()
+                # Criar log de atividade
+                log_activity(
+                    lead=lead,
+                    user=request.user,
+                    action='created',
+                    description=f'Lead criado por {request.user.get_full_name() or request.user.username}'
+                )
             messages.success(request, f'Lead "{lead.nome}" criado com sucesso!')
             return redirect("leads:lead_list")
     else:
@@ -677,11 +480,28 @@ def lead_create(request):
     return render(request, "leads/form.html", {"form": form, "title": "Criar Lead"})
 
 
+def _lead_detail_updated(request, pk):
+    if not hasattr(request, '_lead_data_atualizacao'):
+        request._lead_data_atualizacao = (
+            scoped_leads(request).filter(pk=pk).values_list('data_atualizacao', flat=True).first()
+        )
+    return request._lead_data_atualizacao
+
+
+def _lead_detail_etag(request, pk):
+    # A página inclui mensagens e token CSRF: com mensagens pendentes não há 304
+    updated = _lead_detail_updated(request, pk)
+    if updated is None or has_pending_messages(request):
+        return None
+    return lead_etag(request, updated, request.user.pk, request.META.get('CSRF_COOKIE'))
+
+
 @login_required
+@condition(etag_func=_lead_detail_etag)
 def lead_detail(request, pk):
-    lead = get_object_or_404(Lead, pk=pk)
+    lead = get_object_or_404(Lead.objects.select_related('atendente'), pk=pk)
     # Verificar se ATENDENTE pode ver apenas leads próprios
-    if request.user.groups.filter(name='ATENDENTE').exists() and lead.atendente != request.user:
+    if not request.crm_role.can_access(lead):
         messages.error(request, 'Você não tem permissão para visualizar este lead.')
         return redirect('leads:lead_list')
     return render(request, "leads/detail.html", {"lead": lead})
@@ -691,7 +511,7 @@ def lead_detail(request, pk):
 def lead_edit(request, pk):
     lead = get_object_or_404(Lead, pk=pk)
     # Verificar se ATENDENTE pode editar apenas leads próprios
-    if request.user.groups.filter(name='ATENDENTE').exists() and lead.atendente != request.user:
+    if not request.crm_role.can_access(lead):
         messages.error(request, 'Você não tem permissão para editar este lead.')
         return redirect('leads:lead_list')
     if request.method == "POST":
@@ -699,36 +519,37 @@ def lead_edit(request, pk):
         old_atendente = lead.atendente
         form = LeadForm(request.POST, instance=lead, user=request.user)
         if form.is_valid():
-            lead = form.save()
-
-            # Criar logs de atividade
-            if old_status != lead.status:
-                ActivityLog.objects.create(
-                    lead=lead,
-                    user=request.user,
-                    action='status_changed',
-                    old_value=old_status,
-                    new_value=lead.status,
-                    description=f'Status alterado de "{dict(Lead.STATUS_CHOICES)[old_status]}" para "{dict(Lead.STATUS_CHOICES)[lead.status]}"'
-                )
-
-            if old_atendente != lead.atendente:
-                ActivityLog.objects.create(
-                    lead=lead,
-                    user=request.user,
-                    action='assigned',
-                    old_value=str(old_atendente) if old_atendente else None,
-                    new_value=str(lead.atendente) if lead.atendente else None,
-                    description=f'Atendente alterado para {lead.atendente.get_full_name() if lead.atendente else "Nenhum"}'
-                )
-
-            if old_status == lead.status and old_atendente == lead.atendente:
-                ActivityLog.objects.create(
-                    lead=lead,
-                    user=request.user,
-                    action='updated',
-                    description=f'Lead atualizado por {request.user.get_full_name() or request.user.username}'
-                )
+            with transaction.atomic():
+                lead = form.save()
+
+                # Criar logs de atividade
+                if old_status != lead.status:
+                    log_activity(
+                        lead=lead,
+                        user=request.user,
+                        action='status_changed',
+                        old_value=old_status,
+                        new_value=lead.status,
+                        description=f'Status alterado de "{dict(Lead.STATUS_CHOICES)[old_status]}" para "{dict(Lead.STATUS_CHOICES)[lead.status]}"'
+                    )
+
+                if old_atendente != lead.atendente:
+                    log_activity(
+                        lead=lead,
+                        user=request.user,
+                        action='assigned',
+                        old_value=str(old_atendente) if old_atendente else None,
+                        new_value=str(lead.atendente) if lead.atendente else None,
+                        description=f'Atendente alterado para {lead.atendente.get_full_name() if lead.atendente else "Nenhum"}'
+                    )
+
+                if old_status == lead.status and old_atendente == lead.atendente:
+                    log_activity(
+                        lead=lead,
+                        user=request.user,
+                        action='updated',
+                        description=f'Lead atualizado por {request.user.get_full_name() or request.user.username}'
+                    )
 
             messages.success(request, f'Lead "{lead.nome}" atualizado com sucesso!')
             return redirect("leads:lead_detail", pk=pk)
@@ -741,18 +562,19 @@ def lead_edit(request, pk):
 def lead_delete(request, pk):
     lead = get_object_or_404(Lead, pk=pk)
     # Verificar se ATENDENTE pode deletar apenas leads próprios
-    if request.user.groups.filter(name='ATENDENTE').exists() and lead.atendente != request.user:
+    if not request.crm_role.can_access(lead):
         messages.error(request, 'Você não tem permissão para deletar este lead.')
         return redirect('leads:lead_list')
     if request.method == "POST":
-        # Criar log antes de deletar
-        ActivityLog.objects.create(
-            lead=lead,
-            user=request.user,
-            action='deleted',
-            description=f'Lead deletado por {request.user.get_full_name() or request.user.username}'
-        )
-        lead.delete()
+        with transaction.atomic():
+            # Criar log antes de deletar
+            ActivityLog.objects.create(
+                lead=lead,
+                user=request.user,
+                action='deleted',
+                description=f'Lead deletado por {request.user.get_full_name() or request.user.username}'
+            )
+            lead.delete()
         messages.success(request, f'Lead "{lead.nome}" deletado com sucesso!')
         return redirect("leads:lead_list")
     return render(request, "leads/delete.html", {"lead": lead})